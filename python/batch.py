@@ -0,0 +1,209 @@
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import itertools
+import json
+import re
+import sys
+import time
+
+import constraints
+import sudoku
+from sudoku import (
+    Board,
+    Constraint,
+    GivenDigit,
+    MultipleSolutionsFound,
+    NoSolutionFound,
+    SudokuContradiction,
+)
+
+CHUNK_SIZE = 64
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+CELL_PATTERN = re.compile(r"^R([1-9])C([1-9])$")
+# Classes that add constraints to a board without being constraints themselves
+BUILDER_CLASSES = {"DisjointGroups", "NegativeSumConstraint"}
+STATUSES = [
+    (MultipleSolutionsFound, "multiple solutions"),
+    (NoSolutionFound, "no solution"),
+    (SudokuContradiction, "no solution"),
+]
+
+
+def read_chunks(lines, chunk_size=CHUNK_SIZE):
+    """
+    Yields lists of (line number, line) for the non-blank lines, chunk_size at a
+    time, without reading further ahead than the chunk being yielded.
+    """
+    numbered = ((i, line.strip()) for i, line in enumerate(lines, 1))
+    numbered = ((i, line) for i, line in numbered if line and not line.startswith("#"))
+    while True:
+        chunk = list(itertools.islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def add_givens(board, givens):
+    """
+    givens is an 81 character string in row-major order, with 0 or . for an empty
+    cell.
+    """
+    if len(givens) != 81:
+        raise ValueError("Expected 81 characters of givens, got {}".format(len(givens)))
+    for i, character in enumerate(givens):
+        if character not in "0.":
+            GivenDigit(board, i // 9 + 1, i % 9 + 1, int(character))
+
+
+def resolve_cells(board, value):
+    """
+    Replaces "R3C5" style strings in a JSON value with the board's cells.
+    """
+    if isinstance(value, str):
+        match = CELL_PATTERN.match(value)
+        return board[int(match[1]), int(match[2])] if match else value
+    if isinstance(value, list):
+        return [resolve_cells(board, item) for item in value]
+    return value
+
+
+def get_constraint_class(name):
+    """
+    Returns the constraint class called name. Only Constraint subclasses and the
+    builders in BUILDER_CLASSES can be named by input files.
+    """
+    for module in (constraints, sudoku):
+        constraint_class = getattr(module, name, None)
+        if isinstance(constraint_class, type) and (
+            issubclass(constraint_class, Constraint) or name in BUILDER_CLASSES
+        ):
+            return constraint_class
+    raise ValueError("Unknown constraint {}".format(name))
+
+
+def build_board(line):
+    """
+    Builds a board from a line of input: either 81 characters of givens, or a JSON
+    object such as
+
+        {"givens": "...", "constraints": [{"type": "KillerCage", "args": [["R1C1", "R1C2"], 10]}]}
+
+    where each constraint is built as type(board, *args, **kwargs) with cells
+    written as "R<row>C<column>".
+    """
+    board = Board()
+    if not line.startswith("{"):
+        add_givens(board, line)
+        return board
+
+    puzzle = json.loads(line)
+    if puzzle.get("givens"):
+        add_givens(board, puzzle["givens"])
+    for spec in puzzle.get("constraints", []):
+        get_constraint_class(spec["type"])(
+            board,
+            *resolve_cells(board, spec.get("args", [])),
+            **{
+                key: resolve_cells(board, value)
+                for key, value in spec.get("kwargs", {}).items()
+            }
+        )
+    return board
+
+
+def solve_line(line_number, line, time_limit=None):
+    result = {"line": line_number, "status": "solved", "solution": None}
+    start_time = time.perf_counter()
+    try:
+        board = build_board(line)
+        result["build_seconds"] = time.perf_counter() - start_time
+        # Classic puzzles are solved by exact cover quickly enough not to need one
+        if time_limit is None or (
+            board.exact_cover_fast_path and board.has_only_classic_constraints()
+        ):
+            board.solve()
+        else:
+            stats = board.search(time_limit=time_limit)
+            if stats["status"] != "solved":
+                result["status"] = stats["status"]
+                result["reason"] = stats["reason"]
+        if board.is_solved():
+            result["solution"] = "".join(str(cell.value) for cell in board.cells)
+    except Exception as e:
+        result["status"] = "error"
+        for exception_class, status in STATUSES:
+            if isinstance(e, exception_class):
+                result["status"] = status
+                break
+        result["message"] = str(e).split("\n")[0]
+    result["seconds"] = time.perf_counter() - start_time
+    return result
+
+
+def solve_chunk(chunk, time_limit=None):
+    return [solve_line(line_number, line, time_limit) for line_number, line in chunk]
+
+
+def solve_stream(lines, workers=1, chunk_size=CHUNK_SIZE, time_limit=None):
+    """
+    Yields a result dict for each puzzle in lines as it is solved, which isn't
+    necessarily in input order. With workers > 0, at most
+    CHUNKS_IN_FLIGHT_PER_WORKER chunks per worker are read ahead of the results.
+    """
+    chunks = read_chunks(lines, chunk_size)
+    if not workers:
+        for chunk in chunks:
+            yield from solve_chunk(chunk, time_limit)
+        return
+
+    max_in_flight = workers * CHUNKS_IN_FLIGHT_PER_WORKER
+    with ProcessPoolExecutor(workers) as pool:
+        in_flight = set()
+        for chunk in itertools.chain(chunks, [None]):
+            if chunk is not None:
+                in_flight.add(pool.submit(solve_chunk, chunk, time_limit))
+                if len(in_flight) < max_in_flight:
+                    continue
+            while in_flight and (chunk is None or len(in_flight) >= max_in_flight):
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Solve a file of puzzles, one per line: 81 characters of givens "
+        "for a classic sudoku, or a JSON object for a variant. Writes a JSON result "
+        "per puzzle as it is solved."
+    )
+    parser.add_argument("input", help="puzzle file, or - for stdin")
+    parser.add_argument("-o", "--output", help="results file (default stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=1)
+    parser.add_argument("-c", "--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument(
+        "-t",
+        "--time-limit",
+        type=float,
+        help="seconds per variant puzzle; uses Board.search, which stops at the "
+        "first solution instead of checking it is unique. Classic puzzles are "
+        "still solved by exact cover.",
+    )
+    args = parser.parse_args(argv)
+
+    input_file = sys.stdin if args.input == "-" else open(args.input)
+    output_file = sys.stdout if args.output is None else open(args.output, "w")
+    try:
+        for result in solve_stream(
+            input_file, args.workers, args.chunk_size, args.time_limit
+        ):
+            output_file.write(json.dumps(result) + "\n")
+            output_file.flush()
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import importlib
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import tests
+
+DEFAULT_REPEATS = 5
+DEFAULT_THRESHOLD = 0.2
+COMPARED_METRICS = ["median_seconds", "peak_memory_bytes"]
+# Solver counters reported for each puzzle, and the Board attributes they come from
+COUNTERS = {
+    "checks": "check_count",
+    "enumerated_assignments": "enumerated_assignments",
+    "bifurcations": "bifurcation_count",
+    "quick_check_passes": "quick_check_passes",
+    "quick_check_recomputed": "quick_check_recomputed",
+}
+
+
+def discover_puzzles():
+    """
+    Returns the names of the scripts in tests/ that define build_board(), which
+    builds their board without solving it, or build_boards(), which yields several
+    boards to solve in turn. Scripts are searched rather than imported, as the
+    others solve their puzzles on import.
+    """
+    names = []
+    directory = os.path.dirname(tests.__file__)
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".py"):
+            continue
+        with open(os.path.join(directory, filename)) as f:
+            source = f.read()
+            if "\ndef build_board():" in source or "\ndef build_boards():" in source:
+                names.append(filename[:-3])
+    return names
+
+
+def solve_once(build_boards):
+    """
+    Solves each board from build_boards(), returning the total time spent solving,
+    the solver counters summed over the boards and the set of outcomes.
+    """
+    elapsed = 0
+    counters = dict.fromkeys(COUNTERS, 0)
+    outcomes = set()
+    for board in build_boards():
+        start_time = time.perf_counter()
+        try:
+            board.solve()
+            outcomes.add("solved" if board.is_solved() else "unsolved")
+        except Exception as e:
+            outcomes.add(type(e).__name__)
+        elapsed += time.perf_counter() - start_time
+        for counter, attribute in COUNTERS.items():
+            counters[counter] += getattr(board, attribute)
+    return elapsed, counters, outcomes
+
+
+def get_build_boards(name):
+    module = importlib.import_module("tests." + name)
+    if hasattr(module, "build_boards"):
+        return module.build_boards
+    return lambda: [module.build_board()]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def benchmark_puzzle(name, repeats=DEFAULT_REPEATS):
+    """
+    Solves the puzzle repeats times and returns its timings and solver counters.
+    Peak memory is measured on one extra run, since tracing slows solving down.
+    """
+    build_boards = get_build_boards(name)
+    times = []
+    counters = {counter: [] for counter in COUNTERS}
+    outcomes = set()
+    for _ in range(repeats):
+        elapsed, run_counters, run_outcomes = solve_once(build_boards)
+        times.append(elapsed)
+        outcomes |= run_outcomes
+        for counter, value in run_counters.items():
+            counters[counter].append(value)
+
+    tracemalloc.start()
+    try:
+        solve_once(build_boards)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = {
+        "outcome": "/".join(sorted(outcomes)),
+        "repeats": repeats,
+        "median_seconds": statistics.median(times),
+        "p95_seconds": percentile(times, 0.95),
+        "peak_memory_bytes": peak_memory,
+    }
+    for counter, values in counters.items():
+        result[counter] = statistics.median(values)
+    return result
+
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns a message for each metric in COMPARED_METRICS that is more than
+    threshold (as a fraction) worse than in the baseline, and for each puzzle whose
+    outcome has changed.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]
+        if result["outcome"] != expected["outcome"]:
+            regressions.append(
+                "{}: outcome changed from {} to {}".format(
+                    name, expected["outcome"], result["outcome"]
+                )
+            )
+        for metric in COMPARED_METRICS:
+            if result[metric] > expected[metric] * (1 + threshold):
+                regressions.append(
+                    "{}: {} rose from {:.4g} to {:.4g}".format(
+                        name, metric, expected[metric], result[metric]
+                    )
+                )
+    return regressions
+
+
+def format_results(results):
+    lines = [
+        "{:<26} {:>12} {:>10} {:>10} {:>10} {:>10} {:>8} {:>12}".format(
+            "puzzle",
+            "outcome",
+            "median s",
+            "p95 s",
+            "peak KB",
+            "checks",
+            "bifs",
+            "recomp/pass",
+        )
+    ]
+    for name, result in results.items():
+        lines.append(
+            "{:<26} {:>12} {:>10.3f} {:>10.3f} {:>10.0f} {:>10.0f} {:>8.0f} {:>12.1f}".format(
+                name,
+                result["outcome"][:12],
+                result["median_seconds"],
+                result["p95_seconds"],
+                result["peak_memory_bytes"] / 1024,
+                result["checks"],
+                result["bifurcations"],
+                result["quick_check_recomputed"] / max(1, result["quick_check_passes"]),
+            )
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time Board.solve on the puzzles in tests/ that define "
+        "build_board() or build_boards(), optionally comparing against a baseline "
+        "JSON file."
+    )
+    parser.add_argument(
+        "puzzles", nargs="*", help="puzzle script names (default all of them)"
+    )
+    parser.add_argument("-r", "--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("-o", "--output", help="write results as JSON to this file")
+    parser.add_argument("-b", "--baseline", help="JSON results to compare against")
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="fractional slowdown or memory growth counted as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.puzzles or discover_puzzles():
+        results[name] = benchmark_puzzle(name, args.repeats)
+        print(format_results({name: results[name]}).split("\n")[-1], file=sys.stderr)
+
+    print(format_results(results))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        for regression in regressions:
+            print(regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,103 @@
+from functools import lru_cache
 import itertools
 from re import L
-from sudoku import Constraint, NoRepeatsConstraint
+from sudoku import (
+    ALL_DIGITS_MASK,
+    DIGIT_MASKS,
+    MASK_DIGITS,
+    Constraint,
+    NoRepeatsConstraint,
+    SudokuContradiction,
+    digits_to_mask,
+)
 
 import numpy as np
 
+LOW_WHISPER_DIGITS = 0x00F
+HIGH_WHISPER_DIGITS = 0x1E0
+WHISPER_SUPPORT = [
+    sum(
+        [
+            DIGIT_MASKS[digit]
+            for digit in range(1, 10)
+            if any([abs(digit - other) >= 5 for other in MASK_DIGITS[mask]])
+        ]
+    )
+    for mask in range(ALL_DIGITS_MASK + 1)
+]
+
+
+def digit_range_mask(lowest, highest):
+    return digits_to_mask(range(max(lowest, 1), min(highest, 9) + 1))
+
+
+def distinct_sum_bounds(board, cells):
+    """
+    Returns the smallest and largest totals the cells could have. Cells are
+    grouped so that each group's cells all see each other, and so need different
+    digits, which tightens the bounds beyond the sum of each cell's extremes.
+    """
+    groups = []
+    for cell in cells:
+        for group in groups:
+            if all([board.sees(cell, other) for other in group]):
+                group.append(cell)
+                break
+        else:
+            groups.append([cell])
+
+    masks = board.masks
+    lowest = highest = 0
+    for group in groups:
+        group_masks = [masks[cell.index] for cell in group]
+        candidates = 0
+        for mask in group_masks:
+            candidates |= mask
+        digits = MASK_DIGITS[candidates]
+        lowest += max(
+            sum([MASK_DIGITS[mask][0] for mask in group_masks]),
+            sum(digits[: len(group)]),
+        )
+        highest += min(
+            sum([MASK_DIGITS[mask][-1] for mask in group_masks]),
+            sum(digits[-len(group) :]),
+        )
+    return lowest, highest
+
+
+@lru_cache(maxsize=None)
+def killer_combinations(size, total):
+    """
+    Returns the masks of every set of size distinct digits adding up to total.
+    """
+    return tuple(
+        [
+            digits_to_mask(digits)
+            for digits in itertools.combinations(range(1, 10), size)
+            if sum(digits) == total
+        ]
+    )
+
+
+def can_fill_with(cell_masks, digits_mask):
+    """
+    Returns True if the cells can each take a different digit from digits_mask,
+    found by augmenting paths through a bipartite matching of cells to digits.
+    """
+    matched_cells = {}
+
+    def augment(i, seen):
+        for digit in MASK_DIGITS[cell_masks[i] & digits_mask]:
+            if digit in seen:
+                continue
+            seen.add(digit)
+            if digit not in matched_cells or augment(matched_cells[digit], seen):
+                matched_cells[digit] = i
+                return True
+        return False
+
+    return all([augment(i, set()) for i in range(len(cell_masks))])
+
 
 class KillerCage(NoRepeatsConstraint):
     def __init__(self, board, cells, total):
@@ -21,6 +115,76 @@ class KillerCage(NoRepeatsConstraint):
         else:
             return sum(assignment.values()) > self.total
 
+    def initial_assignment_state(self):
+        return super().initial_assignment_state(), 0
+
+    def extend_assignment(self, assignment, state, cell, value):
+        used, total = state
+        used = super().extend_assignment(assignment, used, cell, value)
+        total += value
+        if used is None or total > self.total:
+            return None
+        if len(assignment) + 1 == len(self.cells) and total != self.total:
+            return None
+        return used, total
+
+    def batch_assignments_invalid(self, assignment_matrix):
+        invalid = super().batch_assignments_invalid(assignment_matrix)
+        return invalid | (assignment_matrix.sum(axis=1) != self.total)
+
+    def quick_update(self):
+        """
+        Works from the digit combinations that could fill the cage rather than from
+        assignments, so it stays cheap for cages too large to enumerate. Digits in
+        no remaining combination are removed, digits in all of them are corner
+        marked, and each cell is limited to the values the other cells' smallest
+        and largest candidates leave room for.
+        """
+        masks = self.board.masks
+        cell_masks = [masks[cell.index] for cell in self.cells]
+        candidates = 0
+        for mask in cell_masks:
+            candidates |= mask
+        required = digits_to_mask(self.corner_marks)
+
+        combinations = [
+            combination
+            for combination in killer_combinations(len(self.cells), self.total)
+            if not combination & ~candidates
+            and not required & ~combination
+            and can_fill_with(cell_masks, combination)
+        ]
+        if not combinations:
+            raise SudokuContradiction(
+                "The constraint {} can no longer be satisfied with possibles {} and pencil marks {}".format(
+                    self,
+                    [set(cell.possibles) for cell in self.cells],
+                    self.corner_marks,
+                )
+            )
+
+        possible = 0
+        always_present = ALL_DIGITS_MASK
+        for combination in combinations:
+            possible |= combination
+            always_present &= combination
+
+        minimums = [MASK_DIGITS[mask][0] for mask in cell_masks]
+        maximums = [MASK_DIGITS[mask][-1] for mask in cell_masks]
+        for cell, minimum, maximum in zip(self.cells, minimums, maximums):
+            lowest = self.total - (sum(maximums) - maximum)
+            highest = self.total - (sum(minimums) - minimum)
+            cell.intersect_mask(possible & digit_range_mask(lowest, highest))
+
+        for digit in MASK_DIGITS[always_present]:
+            if digit not in self.corner_marks:
+                self.add_corner_mark(
+                    digit, [cell for cell in self.cells if digit in cell.possibles]
+                )
+
+    def table_params(self):
+        return (self.total,)
+
 
 class CellsEqual(Constraint):
     def __init__(self, board, cells):
@@ -34,10 +198,17 @@ class CellsEqual(Constraint):
             return True
         return len(set(assignment.values())) != 1
 
+    def extend_assignment(self, assignment, state, cell, value):
+        if assignment and value != next(iter(assignment.values())):
+            return None
+        return super().extend_assignment(assignment, state, cell, value)
+
     def quick_update(self):
-        possibles = set.intersection(*[cell.possibles for cell in self.cells])
+        possibles_mask = ALL_DIGITS_MASK
         for cell in self.cells:
-            cell.intersect_possibles({i for i in possibles})
+            possibles_mask &= cell.possibles_mask
+        for cell in self.cells:
+            cell.intersect_mask(possibles_mask)
 
 
 class DisjointGroup(NoRepeatsConstraint):
@@ -57,6 +228,10 @@ class GermanWhisper(Constraint):
     def __init__(self, board, cells):
         super().__init__(board, cells)
         self.name = "German Whisper {}".format(cells)
+        self.neighbours = {
+            cell: self.cells[max(0, i - 1) : i] + self.cells[i + 1 : i + 2]
+            for i, cell in enumerate(self.cells)
+        }
 
     def partial_assignment_invalid(self, assignment):
         if super().partial_assignment_invalid(assignment):
@@ -67,6 +242,63 @@ class GermanWhisper(Constraint):
                     return True
         return False
 
+    def extend_assignment(self, assignment, state, cell, value):
+        for neighbour in self.neighbours[cell]:
+            if neighbour in assignment and abs(assignment[neighbour] - value) < 5:
+                return None
+        return super().extend_assignment(assignment, state, cell, value)
+
+    def batch_assignments_invalid(self, assignment_matrix):
+        invalid = super().batch_assignments_invalid(assignment_matrix)
+        differences = np.abs(np.diff(assignment_matrix.astype(int), axis=1))
+        return invalid | np.any(differences < 5, axis=1)
+
+    def quick_update(self):
+        """
+        Propagates along the line without enumerating it. Neighbouring digits differ
+        by at least 5, so no cell can be 5 and the line alternates between low
+        (1-4) and high (6-9) digits. Each digit also needs a digit at least 5 away
+        in the neighbouring cells on both sides.
+        """
+        if len(self.cells) < 2:
+            return
+        masks = self.board.masks
+        for cell in self.cells:
+            cell.remove_mask(DIGIT_MASKS[5])
+
+        even_cells = self.cells[0::2]
+        odd_cells = self.cells[1::2]
+        even_low = all(
+            [masks[cell.index] & LOW_WHISPER_DIGITS for cell in even_cells]
+        ) and all([masks[cell.index] & HIGH_WHISPER_DIGITS for cell in odd_cells])
+        even_high = all(
+            [masks[cell.index] & HIGH_WHISPER_DIGITS for cell in even_cells]
+        ) and all([masks[cell.index] & LOW_WHISPER_DIGITS for cell in odd_cells])
+        if not even_low and not even_high:
+            raise SudokuContradiction(
+                "{} can't alternate between low and high digits".format(self)
+            )
+        if even_low != even_high:
+            even_side = LOW_WHISPER_DIGITS if even_low else HIGH_WHISPER_DIGITS
+            odd_side = LOW_WHISPER_DIGITS | HIGH_WHISPER_DIGITS
+            odd_side &= ~even_side
+            for cell in even_cells:
+                cell.intersect_mask(even_side)
+            for cell in odd_cells:
+                cell.intersect_mask(odd_side)
+
+        last = len(self.cells) - 1
+        start_count = None
+        while start_count != self.board.modification_count:
+            start_count = self.board.modification_count
+            for i in itertools.chain(range(last + 1), range(last, -1, -1)):
+                support = ALL_DIGITS_MASK
+                if i > 0:
+                    support &= WHISPER_SUPPORT[masks[self.cells[i - 1].index]]
+                if i < last:
+                    support &= WHISPER_SUPPORT[masks[self.cells[i + 1].index]]
+                self.cells[i].intersect_mask(support)
+
 
 class Arrow(Constraint):
     def __init__(self, board, bulb, arrow):
@@ -93,6 +325,61 @@ class Arrow(Constraint):
         else:
             return sum(arrow_assignment.values()) > max(target)
 
+    def initial_assignment_state(self):
+        return super().initial_assignment_state(), 0, 0
+
+    def extend_assignment(self, assignment, state, cell, value):
+        """
+        The running state also holds the sum of the arrow cells assigned so far and
+        how many of them there are.
+        """
+        base_state, arrow_sum, arrow_count = state
+        if cell is self.bulb:
+            bulb_mask = DIGIT_MASKS[value]
+        else:
+            arrow_sum += value
+            arrow_count += 1
+            if self.bulb in assignment:
+                bulb_mask = DIGIT_MASKS[assignment[self.bulb]]
+            else:
+                bulb_mask = self.bulb.possibles_mask
+
+        if arrow_count == len(self.arrow):
+            if arrow_sum > 9 or not bulb_mask & DIGIT_MASKS[arrow_sum]:
+                return None
+        elif arrow_sum > MASK_DIGITS[bulb_mask][-1]:
+            return None
+
+        base_state = super().extend_assignment(assignment, base_state, cell, value)
+        if base_state is None:
+            return None
+        return base_state, arrow_sum, arrow_count
+
+    def batch_assignments_invalid(self, assignment_matrix):
+        invalid = super().batch_assignments_invalid(assignment_matrix)
+        arrow_sums = assignment_matrix[:, 1:].sum(axis=1)
+        return invalid | (arrow_sums != assignment_matrix[:, 0])
+
+    def quick_update(self):
+        """
+        Bounds the bulb by the smallest and largest sums the arrow could have, and
+        each arrow cell by what the bulb and the rest of the arrow leave room for,
+        without enumerating the arrow.
+        """
+        lowest, highest = distinct_sum_bounds(self.board, self.arrow)
+        self.bulb.intersect_mask(digit_range_mask(lowest, highest))
+
+        bulb_digits = MASK_DIGITS[self.bulb.possibles_mask]
+        for i, cell in enumerate(self.arrow):
+            others_lowest, others_highest = distinct_sum_bounds(
+                self.board, self.arrow[:i] + self.arrow[i + 1 :]
+            )
+            cell.intersect_mask(
+                digit_range_mask(
+                    bulb_digits[0] - others_highest, bulb_digits[-1] - others_lowest
+                )
+            )
+
 
 class GivenPossibles(Constraint):
     def __init__(self, board, cell, possibles):
@@ -107,6 +394,14 @@ class GivenPossibles(Constraint):
             return assignment[self.cells[0]] not in self.possibles
         return False
 
+    def extend_assignment(self, assignment, state, cell, value):
+        if value not in self.possibles:
+            return None
+        return super().extend_assignment(assignment, state, cell, value)
+
+    def table_params(self):
+        return tuple(sorted(self.possibles))
+
 
 def nonzero_mod(v, mod):
     output = v % mod
@@ -228,15 +523,23 @@ class BlackKropki(NoRepeatsConstraint):
         if self.cells[0] in assignment and self.cells[1] in assignment:
             return min(assignment.values()) * 2 != max(assignment.values())
 
+    def batch_assignments_invalid(self, assignment_matrix):
+        invalid = super().batch_assignments_invalid(assignment_matrix)
+        smaller = assignment_matrix.min(axis=1).astype(int)
+        return invalid | (smaller * 2 != assignment_matrix.max(axis=1))
+
+    def table_params(self):
+        return ()
+
 
 class Palindrome(Constraint):
     def __init__(self, board, cells):
         super().__init__(board, cells)
         self.name = "Palindrome {}".format(self.cells)
+        self.inverse_cells = dict(zip(self.cells, reversed(self.cells)))
 
     def get_inverse_cell(self, cell):
-        this_cell_index = self.cells.index(cell)
-        return self.cells[-(this_cell_index + 1)]
+        return self.inverse_cells[cell]
 
     def partial_assignment_invalid(self, assignment):
         if super().partial_assignment_invalid(assignment):
@@ -247,6 +550,16 @@ class Palindrome(Constraint):
                 if assignment[cell] != assignment[inverse_cell]:
                     return True
 
+    def extend_assignment(self, assignment, state, cell, value):
+        inverse_cell = self.get_inverse_cell(cell)
+        if assignment.get(inverse_cell, value) != value:
+            return None
+        return super().extend_assignment(assignment, state, cell, value)
+
+    def batch_assignments_invalid(self, assignment_matrix):
+        invalid = super().batch_assignments_invalid(assignment_matrix)
+        return invalid | np.any(assignment_matrix != assignment_matrix[:, ::-1], axis=1)
+
 
 class Skyscraper(Constraint):
     def __init__(self, board, side, index, value):
@@ -326,6 +639,21 @@ class LiarSumConstraint(Constraint):
         if len(assignment) == len(self.cells):
             return sum(assignment.values()) == self.avoid_sum
 
+    def initial_assignment_state(self):
+        return 0
+
+    def extend_assignment(self, assignment, state, cell, value):
+        """
+        The running state is the sum of the cells assigned so far.
+        """
+        state += value
+        if len(assignment) + 1 == len(self.cells) and state == self.avoid_sum:
+            return None
+        return state
+
+    def table_params(self):
+        return (self.avoid_sum,)
+
 
 class NegativeSumConstraint:
     def __init__(self, board, avoid_sum):
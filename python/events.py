@@ -0,0 +1,189 @@
+from collections import Counter
+import json
+import sys
+
+
+class Event:
+    """
+    Something the solver did or found. kind names what happened, level is the
+    bifurcation level it happened at, and constraint, cells and digits are what it
+    concerns. Any other details are kept as attributes.
+    """
+
+    def __init__(self, kind, level, constraint=None, cells=(), digits=(), **details):
+        self.kind = kind
+        self.level = level
+        self.constraint = constraint
+        self.cells = cells
+        self.digits = digits
+        self.details = details
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["details"][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __repr__(self):
+        return "Event({}, {})".format(self.kind, format_event(self))
+
+
+class EventStream:
+    """
+    Passes events to the subscribed callables. Is falsy when there are no
+    subscribers, so that callers can skip building events nobody will see.
+    """
+
+    def __init__(self):
+        self.subscribers = []
+
+    def __bool__(self):
+        return bool(self.subscribers)
+
+    def subscribe(self, subscriber):
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.remove(subscriber)
+
+    def publish(self, event):
+        for subscriber in self.subscribers:
+            subscriber(event)
+
+
+def _format_pairs(pairs):
+    return "[{}]".format(
+        ", ".join(
+            "(({}, {}), ({}, {}))".format(c1, v1, c2, v2)
+            for (c1, v1), (c2, v2) in pairs
+        )
+    )
+
+
+EVENT_FORMATS = {
+    "corner_mark": lambda e: "Adding {} corner mark to {} in {}".format(
+        e.digits[0], list(e.cells), e.constraint
+    ),
+    "hidden_single": lambda e: "The {} in {} can only go in {}".format(
+        e.digits[0], e.constraint, e.cells[0]
+    ),
+    "constraint_change": lambda e: "\n".join(
+        ["Change detected checking {}".format(e.constraint.name)]
+        + [
+            "  New possibles for {} are {{{}}}".format(
+                cell, ", ".join(map(str, sorted(possibles)))
+            )
+            for cell, possibles in zip(e.cells, e.possibles)
+        ]
+    ),
+    "constraint_exception": lambda e: "Exception raised checking {}:\n\n {}".format(
+        e.constraint.name, e.traceback
+    ),
+    "pencil_mark_tuple": lambda e: "Pencil marks tell me that cells {} must be from {}.".format(
+        ", ".join(map(str, e.cells)), ", ".join(map(str, e.digits))
+    ),
+    "naked_tuple": lambda e: "{} {} found in {}".format(
+        "".join(map(str, e.digits)), e.tuple_name, e.constraint.name
+    ),
+    "last_place": lambda e: "Where can the {} go in {}?".format(
+        e.digits[0], e.constraint
+    ),
+    "finalise": lambda e: "Finalising {} as {}".format(e.cells[0], e.digits[0]),
+    "implication_contradiction": lambda e: "Assigning {} = {} leads to contradictions: {}. Removing this assignment.".format(
+        e.cells[0], e.digits[0], _format_pairs(e.pairs)
+    ),
+    "bifurcation": lambda e: "Bifurcating on {} = {}".format(e.cells[0], e.digits[0]),
+    "bifurcation_result": lambda e: {
+        "contradiction": "Contradiction found: {}. {} eliminated for {}",
+        "no_contradiction": "No contradiction or solution found for {1} = {2}",
+        "solution": "Solution found for {1} = {2}",
+        "abandoned": "Abandoned {1} = {2}: {0}",
+    }[e.outcome].format(e.reason, e.digits[0], e.cells[0]),
+    "implied_contradiction": lambda e: "{} = {} implies {} = {}, which leads to a contradiction. {} eliminated for {}".format(
+        e.cells[0], e.digits[0], e.cells[1], e.digits[1], e.digits[0], e.cells[0]
+    ),
+    "solution": lambda e: "Solution found!\n{}".format(e.snapshot),
+    "search_depth_exhausted": lambda e: "No solution found at depth {}".format(e.depth),
+    "budget_exhausted": lambda e: e.reason,
+}
+
+
+def format_event(event):
+    return EVENT_FORMATS[event.kind](event)
+
+
+class HumanLog:
+    """
+    Writes events as indented text. What happens while testing a hypothesis is
+    held back, and only written if the hypothesis led to a contradiction.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self._hypotheses = []
+
+    def __call__(self, event):
+        lines = ["  " * event.level + line for line in format_event(event).split("\n")]
+        if event.kind == "bifurcation":
+            self._hypotheses.append(lines)
+            return
+        if event.kind == "bifurcation_result":
+            # The hypothesis may have started before this log was subscribed
+            hypothesis_lines = self._hypotheses.pop() if self._hypotheses else []
+            if event.outcome != "contradiction":
+                return
+            lines = hypothesis_lines + lines
+        self._write(lines)
+
+    def _write(self, lines):
+        if self._hypotheses:
+            self._hypotheses[-1].extend(lines)
+            return
+        stream = self.stream or sys.stdout
+        stream.write("".join(line + "\n" for line in lines))
+        stream.flush()
+
+
+class JsonLinesLog:
+    """
+    Writes every event, including those inside hypotheses, as a line of JSON.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def __call__(self, event):
+        record = {
+            "kind": event.kind,
+            "level": event.level,
+            "constraint": None if event.constraint is None else str(event.constraint),
+            "cells": [str(cell) for cell in event.cells],
+            "digits": list(event.digits),
+        }
+        record.update(event.details)
+        (self.stream or sys.stdout).write(json.dumps(record, default=str) + "\n")
+
+
+class EventCounter:
+    """
+    Counts events by kind.
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def __call__(self, event):
+        self.counts[event.kind] += 1
+
+
+class EventRecorder:
+    """
+    Keeps every event in a list.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
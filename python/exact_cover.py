@@ -0,0 +1,80 @@
+def exact_covers(columns, rows, limit=None):
+    """
+    Yields exact covers as lists of row keys, stopping after limit of them.
+    columns maps each column to the set of rows covering it, and rows maps each row
+    to the list of columns it covers. columns is modified while searching but is
+    left as it was once the generator is exhausted or closed.
+    """
+    found = 0
+    for cover in _search(columns, rows, []):
+        yield list(cover)
+        found += 1
+        if limit is not None and found >= limit:
+            return
+
+
+def _search(columns, rows, partial):
+    if not columns:
+        yield partial
+        return
+
+    column = min(columns, key=lambda c: len(columns[c]))
+    for row in list(columns[column]):
+        partial.append(row)
+        removed = _select(columns, rows, row)
+        try:
+            yield from _search(columns, rows, partial)
+        finally:
+            _deselect(columns, rows, row, removed)
+            partial.pop()
+
+
+def _select(columns, rows, row):
+    removed = []
+    for column in rows[row]:
+        for other_row in columns[column]:
+            for other_column in rows[other_row]:
+                if other_column != column:
+                    columns[other_column].remove(other_row)
+        removed.append(columns.pop(column))
+    return removed
+
+
+def _deselect(columns, rows, row, removed):
+    for column in reversed(rows[row]):
+        columns[column] = removed.pop()
+        for other_row in columns[column]:
+            for other_column in rows[other_row]:
+                if other_column != column:
+                    columns[other_column].add(other_row)
+
+
+def sudoku_solutions(candidates, limit=2):
+    """
+    Returns up to limit solutions to a classic sudoku, each a list of 81 digits.
+    candidates holds the digits still possible in each cell, in row-major order.
+    """
+    rows = {}
+    for index, digits in enumerate(candidates):
+        row, column = divmod(index, 9)
+        box = 3 * (row // 3) + column // 3
+        for digit in digits:
+            rows[(index, digit)] = [
+                index,
+                81 + 9 * row + digit - 1,
+                162 + 9 * column + digit - 1,
+                243 + 9 * box + digit - 1,
+            ]
+
+    columns = {column: set() for column in range(324)}
+    for key, covered in rows.items():
+        for column in covered:
+            columns[column].add(key)
+
+    solutions = []
+    for cover in exact_covers(columns, rows, limit):
+        solution = [0] * 81
+        for index, digit in cover:
+            solution[index] = digit
+        solutions.append(solution)
+    return solutions
@@ -0,0 +1,140 @@
+from collections import defaultdict
+
+PROFILE_FIELDS = [
+    "checks",
+    "total_seconds",
+    "max_seconds",
+    "enumerated_assignments",
+    "limit_skips",
+    "eliminations",
+]
+
+
+class ConstraintProfile:
+    def __init__(self):
+        self.checks = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.enumerated_assignments = 0
+        self.limit_skips = 0
+        self.eliminations = 0
+
+    def add(self, other):
+        for field in PROFILE_FIELDS:
+            if field == "max_seconds":
+                self.max_seconds = max(self.max_seconds, other.max_seconds)
+            else:
+                setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in PROFILE_FIELDS}
+
+
+class ConstraintProfiler:
+    """
+    Records how much work each constraint causes. Attach one as board.profiler
+    before solving; with a stream, the hot-spot report is written to it when the
+    solve finishes.
+    """
+
+    def __init__(self, stream=None, sort_by="total_seconds", limit=20):
+        self.stream = stream
+        self.sort_by = sort_by
+        self.limit = limit
+        self.profiles = defaultdict(ConstraintProfile)
+        self.quick_check_passes = 0
+        self.quick_check_recomputed = 0
+        self.quick_check_present = 0
+
+    def record_check(self, constraint, elapsed, eliminations):
+        profile = self.profiles[constraint]
+        profile.checks += 1
+        profile.total_seconds += elapsed
+        if elapsed > profile.max_seconds:
+            profile.max_seconds = elapsed
+        profile.eliminations += eliminations
+
+    def record_enumeration(self, constraint, assignment_count):
+        self.profiles[constraint].enumerated_assignments += assignment_count
+
+    def record_limit_skip(self, constraint):
+        self.profiles[constraint].limit_skips += 1
+
+    def record_quick_check(self, recomputed, present):
+        """
+        Records a quick_bifurcation_check pass that recomputed recomputed of the
+        present literals.
+        """
+        self.quick_check_passes += 1
+        self.quick_check_recomputed += recomputed
+        self.quick_check_present += present
+
+    def by_constraint(self):
+        return {str(constraint): p for constraint, p in self.profiles.items()}
+
+    def by_class(self):
+        profiles = defaultdict(ConstraintProfile)
+        for constraint, profile in self.profiles.items():
+            profiles[type(constraint).__name__].add(profile)
+        return dict(profiles)
+
+    def as_dict(self):
+        return {
+            "constraints": {
+                name: profile.as_dict()
+                for name, profile in self.by_constraint().items()
+            },
+            "classes": {
+                name: profile.as_dict() for name, profile in self.by_class().items()
+            },
+            "quick_checks": {
+                "passes": self.quick_check_passes,
+                "recomputed": self.quick_check_recomputed,
+                "present": self.quick_check_present,
+            },
+        }
+
+    def report(self, sort_by=None, limit=None):
+        sort_by = sort_by or self.sort_by
+        limit = limit or self.limit
+        sections = []
+        for title, profiles in [
+            ("Constraint class", self.by_class()),
+            ("Constraint", self.by_constraint()),
+        ]:
+            ranked = sorted(
+                profiles.items(), key=lambda item: -getattr(item[1], sort_by)
+            )
+            lines = [
+                "{:<50} {:>7} {:>9} {:>9} {:>11} {:>6} {:>7}".format(
+                    title, "checks", "total s", "max s", "assignments", "skips", "elims"
+                )
+            ]
+            for name, profile in ranked[:limit]:
+                lines.append(
+                    "{:<50} {:>7} {:>9.3f} {:>9.4f} {:>11} {:>6} {:>7}".format(
+                        name[:50],
+                        profile.checks,
+                        profile.total_seconds,
+                        profile.max_seconds,
+                        profile.enumerated_assignments,
+                        profile.limit_skips,
+                        profile.eliminations,
+                    )
+                )
+            sections.append("\n".join(lines))
+        if self.quick_check_passes:
+            sections.append(
+                "Quick bifurcation checks: {} passes recomputed {:.1f} of {:.1f} "
+                "literals per pass".format(
+                    self.quick_check_passes,
+                    self.quick_check_recomputed / self.quick_check_passes,
+                    self.quick_check_present / self.quick_check_passes,
+                )
+            )
+        return "\n\n".join(sections)
+
+    def solve_finished(self):
+        if self.stream is not None:
+            self.stream.write(self.report() + "\n")
+            self.stream.flush()
@@ -1,18 +1,39 @@
-from collections import Counter, defaultdict, deque
-from copy import deepcopy
-import io
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import copy
+from heapq import heappop, heappush
 import itertools
 import numpy as np
-import networkx as nx
+import pickle
 import sys
+import time
 from traceback import format_exc
-import uuid
 
 from tqdm import tqdm as tq
 
+from events import Event, EventRecorder, EventStream
+from exact_cover import sudoku_solutions
+
 ALL_POSSIBLE_ASSIGNMENTS_LIMIT = 1e5 + 1
+ASSIGNMENT_CACHE_SIZE = 32
+EXTENSIONAL_TABLE_MAX_CELLS = 3
+PEER_INDEX_CACHE_SIZE = 128
+# Constraints whose estimated cost is at most SCHEDULER_TIER_COSTS[i] go in tier i;
+# anything costlier goes last.
+SCHEDULER_TIER_COSTS = (1e2, 1e3, 1e4, 3e4)
 BIFURCATION_LIMIT = 1e5
 MAX_BIFURCATION_LEVEL = 1
+MAX_SEARCH_DEPTH = 3
+# Board attributes that search() changes while it runs and restores afterwards
+SEARCH_SETTINGS = (
+    "max_bifurcation_level",
+    "bifurcation_limit",
+    "bifurcation_scoring",
+    "deadline",
+    "stop_at_first_solution",
+)
 N_TUPLE_NAMES = {
     1: "single",
     2: "pair",
@@ -23,17 +44,155 @@ N_TUPLE_NAMES = {
     7: "septuple",
     8: "octuple",
 }
-msg_indent = 0
-
+ALL_DIGITS_MASK = 0x1FF
+DIGIT_MASKS = {digit: 1 << (digit - 1) for digit in range(1, 10)}
+MASK_DIGITS = [
+    tuple(digit for digit in range(1, 10) if mask & DIGIT_MASKS[digit])
+    for mask in range(ALL_DIGITS_MASK + 1)
+]
+MASK_DIGIT_SETS = [frozenset(digits) for digits in MASK_DIGITS]
+MASK_STRINGS = ["".join(map(str, digits)) for digits in MASK_DIGITS]
+POPCOUNT = [len(digits) for digits in MASK_DIGITS]
+# A cell's factor in its constraints' candidate_product. An empty cell counts as 1
+# so that the product can be divided by it again when the cell is restored.
+CANDIDATE_FACTORS = [max(1, count) for count in POPCOUNT]
+DIGIT_BITS = np.array([0] + [DIGIT_MASKS[digit] for digit in range(1, 10)])
+
+
+def digits_to_mask(digits):
+    mask = 0
+    for digit in digits:
+        mask |= DIGIT_MASKS.get(digit, 0)
+    return mask
+
+
+def column_mask(column):
+    return int(np.bitwise_or.reduce(DIGIT_BITS[column]))
+
+
+def cell_literal(cell, value):
+    return 9 * cell.index + value - 1
+
+
+def iter_bits(bitset):
+    while bitset:
+        low_bit = bitset & -bitset
+        yield low_bit.bit_length() - 1
+        bitset ^= low_bit
+
+
+def co_occurrence_table(column_1, column_2):
+    """
+    Returns a 10x10 boolean array whose [v1, v2] entry shows whether v1 in column_1
+    appears in the same row as v2 in column_2.
+    """
+    pair_codes = column_1.astype(np.intp) * 10 + column_2
+    return (np.bincount(pair_codes, minlength=100) > 0).reshape(10, 10)
+
+
+def cartesian_product(value_lists):
+    grids = np.meshgrid(
+        *[np.array(values, dtype=np.int8) for values in value_lists], indexing="ij"
+    )
+    return np.stack(grids, axis=-1).reshape(-1, len(value_lists))
+
+
+_overriding_classes = {}
+
+
+def overrides_partial_check(constraint_class, method_name):
+    """
+    Returns whether constraint_class's nearest definition of method_name is at
+    least as specific as its nearest definition of partial_assignment_invalid, so
+    that the method accounts for every rule the class adds.
+    """
+    key = (constraint_class, method_name)
+    if key not in _overriding_classes:
+        for klass in constraint_class.__mro__:
+            if method_name in vars(klass):
+                _overriding_classes[key] = True
+                break
+            if "partial_assignment_invalid" in vars(klass):
+                _overriding_classes[key] = False
+                break
+    return _overriding_classes[key]
+
+
+def has_batch_predicate(constraint_class):
+    """
+    A constraint class can be enumerated in batch if its batch_assignments_invalid
+    overrides its partial_assignment_invalid.
+    """
+    return overrides_partial_check(constraint_class, "batch_assignments_invalid")
+
+
+def has_incremental_check(constraint_class):
+    """
+    A constraint class is enumerated with extend_assignment if that overrides its
+    partial_assignment_invalid.
+    """
+    return overrides_partial_check(constraint_class, "extend_assignment")
+
+
+_extensional_tables = {}
+
+
+def get_extensional_table(constraint):
+    """
+    Returns every assignment allowed by the constraint's own rule, ignoring the
+    board's candidates and corner marks, as a 2-D array. Tables are built once per
+    process and shared by all constraints with the same type, cell count, table
+    parameters and pattern of cells that see each other.
+    """
+    seeing_pairs = tuple(
+        [
+            (i, j)
+            for (i, c1), (j, c2) in itertools.combinations(
+                enumerate(constraint.cells), 2
+            )
+            if constraint.board.sees(c1, c2)
+        ]
+    )
+    key = (
+        type(constraint),
+        len(constraint.cells),
+        constraint.table_params(),
+        seeing_pairs,
+    )
+    if key not in _extensional_tables:
+        corner_marks = constraint.corner_marks
+        constraint.corner_marks = {}
+        try:
+            table = cartesian_product([range(1, 10)] * len(constraint.cells))
+            if has_batch_predicate(type(constraint)):
+                invalid = constraint.batch_assignments_invalid(table)
+            else:
+                invalid = np.array(
+                    [
+                        bool(
+                            constraint.partial_assignment_invalid(
+                                dict(zip(constraint.cells, row))
+                            )
+                        )
+                        for row in table.tolist()
+                    ],
+                    dtype=bool,
+                )
+        finally:
+            constraint.corner_marks = corner_marks
+        _extensional_tables[key] = table[~invalid]
+    return _extensional_tables[key]
 
-def print_msg(msg, indent_override=None):
-    lines = str(msg).split("\n")
-    for line in lines:
-        print(
-            "  " * (msg_indent if indent_override is None else indent_override) + line
-        )
 
-    sys.stdout.flush()
+def _unpickle_hashable(cls, hashed_attributes):
+    """
+    Cells and constraints are hashed by attributes that have to be restored
+    before they are added to the sets and dicts that refer to them while
+    unpickling.
+    """
+    obj = cls.__new__(cls)
+    obj.__dict__.update(hashed_attributes)
+    return obj
 
 
 def get_box(row, column):
@@ -59,10 +218,385 @@ class NoBifurcationsLeft(Exception):
     pass
 
 
+class BudgetExhausted(Exception):
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
+    def __reduce__(self):
+        return BudgetExhausted, (str(self), self.reason)
+
+
+class SolutionFound(Exception):
+    """
+    Raised out of a hypothesis when searching, carrying the solved cell masks.
+    """
+
+    def __init__(self, masks):
+        super().__init__("Solution found")
+        self.masks = masks
+
+
+class ConstraintQueue:
+    """
+    Queue of constraints waiting to be checked. A constraint is pending at most
+    once: append ignores constraints that are already pending, while appendleft
+    always moves the constraint to the front.
+    """
+
+    def __init__(self, constraints=()):
+        self._entries = deque()
+        self._pending = set()
+        self.enqueue_count = 0
+        self.duplicate_count = 0
+        self.max_length = 0
+        self.extend(constraints)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __bool__(self):
+        return bool(self._pending)
+
+    def __contains__(self, constraint):
+        return constraint in self._pending
+
+    def __iter__(self):
+        return iter(list(self._pending))
+
+    def _add_pending(self, constraint):
+        self._pending.add(constraint)
+        self.enqueue_count += 1
+        if len(self._pending) > self.max_length:
+            self.max_length = len(self._pending)
+
+    def append(self, constraint):
+        if constraint in self._pending:
+            self.duplicate_count += 1
+            return
+        self._add_pending(constraint)
+        self._push(constraint)
+
+    def appendleft(self, constraint):
+        if constraint not in self._pending:
+            self._add_pending(constraint)
+        # Any later entry for this constraint is skipped by popleft once it has run
+        self._push_front(constraint)
+
+    def extend(self, constraints):
+        for constraint in constraints:
+            self.append(constraint)
+
+    def popleft(self):
+        while True:
+            constraint = self._pop()
+            if constraint in self._pending:
+                self._pending.remove(constraint)
+                return constraint
+
+    def copy(self):
+        new_queue = copy(self)
+        new_queue._entries = deque(self._entries)
+        new_queue._pending = set(self._pending)
+        return new_queue
+
+    def _push(self, constraint):
+        self._entries.append(constraint)
+
+    def _push_front(self, constraint):
+        self._entries.appendleft(constraint)
+
+    def _pop(self):
+        return self._entries.popleft()
+
+
+class ConstraintScheduler(ConstraintQueue):
+    """
+    ConstraintQueue that postpones expensive constraints until cheaper propagation
+    has reached a fixpoint.
+
+    appendleft entries (cell finalisation) always run first. Other constraints are
+    placed in a tier by their estimated enumeration cost, and each tier is first
+    in, first out, so that a constraint waiting in a tier sees the changes made
+    while it waits in a single check.
+    """
+
+    def __init__(self, constraints=()):
+        self._tiers = [deque() for _ in range(len(SCHEDULER_TIER_COSTS) + 1)]
+        super().__init__(constraints)
+
+    def copy(self):
+        new_queue = super().copy()
+        new_queue._tiers = [deque(tier) for tier in self._tiers]
+        return new_queue
+
+    def _push(self, constraint):
+        tier = bisect_left(SCHEDULER_TIER_COSTS, constraint.estimated_cost())
+        self._tiers[tier].append(constraint)
+
+    def _pop(self):
+        if self._entries:
+            return self._entries.popleft()
+
+        for tier in self._tiers:
+            if tier:
+                return tier.popleft()
+
+        raise IndexError("pop from an empty ConstraintScheduler")
+
+
+class PeerIndex:
+    """
+    For each cell index, an integer bitset of the cells that share a
+    NoRepeatsConstraint with it.
+    """
+
+    def __init__(self, regions, cell_count=81):
+        self.peers = [0] * cell_count
+        for region in regions:
+            region_mask = 0
+            for index in region:
+                region_mask |= 1 << index
+            for index in region:
+                self.peers[index] |= region_mask & ~(1 << index)
+
+        self.peer_pairs = [
+            (i, j)
+            for i, peers in enumerate(self.peers)
+            for j in range(i + 1, cell_count)
+            if peers >> j & 1
+        ]
+
+        self.peer_literals = []
+        for i, peers in enumerate(self.peers):
+            literals = ALL_DIGITS_MASK << 9 * i
+            for j in iter_bits(peers):
+                literals |= ALL_DIGITS_MASK << 9 * j
+            self.peer_literals.append(literals)
+
+        # Literal 9 * cell index + digit - 1 contradicts the same digit in a peer
+        # and every other digit in the same cell
+        self.literal_contradictions = []
+        for i, peers in enumerate(self.peers):
+            cell_literals = ALL_DIGITS_MASK << 9 * i
+            for digit_index in range(9):
+                literal = 9 * i + digit_index
+                contradictions = cell_literals & ~(1 << literal)
+                for j in iter_bits(peers):
+                    contradictions |= 1 << 9 * j + digit_index
+                self.literal_contradictions.append(contradictions)
+
+
+class ImplicationEngine:
+    """
+    Directed graph of forcing implications between (cell, digit) literals, numbered
+    9 * cell index + digit - 1, together with the pairs of literals that cannot
+    both hold. Every set of literals is an integer bitset.
+
+    The transitive closure of the implications is kept up to date as edges are
+    added and literals removed. The union of the contradictions of every literal a
+    literal implies is cached, so whether assuming a literal leads to a
+    contradiction is a single AND; literals whose closure or contradictions have
+    changed since the cache was last updated are marked dirty.
+    """
+
+    def __init__(self, literal_count=729):
+        self.literal_count = literal_count
+        self.present = (1 << literal_count) - 1
+        self.direct = [0] * literal_count
+        self.parents = [0] * literal_count
+        self.reach = [1 << literal for literal in range(literal_count)]
+        self.ancestors = list(self.reach)
+        self.contradictions = [0] * literal_count
+        self.conflicts = [0] * literal_count
+        self.dirty = self.present
+        self.reach_changed = self.present
+
+    def __contains__(self, literal):
+        return self.present >> literal & 1
+
+    def __iter__(self):
+        return iter_bits(self.present)
+
+    def add_contradictions(self, contradictions):
+        """
+        contradictions is a list with a bitset of contradicting literals for each
+        literal.
+        """
+        for literal, new in enumerate(contradictions):
+            new &= ~self.contradictions[literal]
+            if not new:
+                continue
+            self.contradictions[literal] |= new
+            self.dirty |= self.ancestors[literal]
+
+    def add_contradiction(self, l1, l2):
+        if self.contradictions[l1] >> l2 & 1:
+            return
+        self.contradictions[l1] |= 1 << l2
+        self.contradictions[l2] |= 1 << l1
+        self.dirty |= self.ancestors[l1] | self.ancestors[l2]
+
+    def add_edge(self, l1, l2):
+        if self.direct[l1] >> l2 & 1:
+            return False
+        self._add_literal(l1)
+        self._add_literal(l2)
+        self.direct[l1] |= 1 << l2
+        self.parents[l2] |= 1 << l1
+        if self.reach[l1] >> l2 & 1:
+            return True
+
+        new_reach = self.reach[l2]
+        new_ancestors = self.ancestors[l1]
+        for ancestor in iter_bits(new_ancestors):
+            self.reach[ancestor] |= new_reach
+        self.dirty |= new_ancestors
+        self.reach_changed |= new_ancestors
+        for descendant in iter_bits(new_reach):
+            self.ancestors[descendant] |= new_ancestors
+        return True
+
+    def _add_literal(self, literal):
+        if self.present >> literal & 1:
+            return
+        self.present |= 1 << literal
+        self.reach[literal] = self.ancestors[literal] = 1 << literal
+        self.dirty |= 1 << literal
+        self.reach_changed |= 1 << literal
+
+    def remove_literals(self, literals):
+        removed = 0
+        for literal in literals:
+            removed |= 1 << literal
+        removed &= self.present
+        if not removed:
+            return
+
+        self.present &= ~removed
+        stale_reach = 0
+        stale_ancestors = 0
+        for literal in iter_bits(removed):
+            stale_reach |= self.ancestors[literal]
+            stale_ancestors |= self.reach[literal]
+            for child in iter_bits(self.direct[literal]):
+                self.parents[child] &= ~removed
+            for parent in iter_bits(self.parents[literal]):
+                self.direct[parent] &= ~removed
+            self.direct[literal] = self.parents[literal] = 0
+            self.reach[literal] = self.ancestors[literal] = 0
+
+        stale_reach &= self.present
+        for literal in iter_bits(stale_reach):
+            self.reach[literal] = self._closure(literal, self.direct)
+        self.dirty = (self.dirty | stale_reach) & self.present
+        self.reach_changed |= stale_reach | removed
+        for literal in iter_bits(stale_ancestors & self.present):
+            self.ancestors[literal] = self._closure(literal, self.parents)
+
+    def _closure(self, literal, edges):
+        closure = 1 << literal
+        frontier = edges[literal] & ~closure
+        while frontier:
+            closure |= frontier
+            next_frontier = 0
+            for node in iter_bits(frontier):
+                next_frontier |= edges[node]
+            frontier = next_frontier & ~closure
+        return closure
+
+    def update_conflicts(self):
+        """
+        Recomputes the cached conflicts of the dirty literals, returning them as a
+        bitset.
+        """
+        updated = self.dirty & self.present
+        for literal in iter_bits(updated):
+            conflicts = 0
+            for implied in iter_bits(self.reach[literal]):
+                conflicts |= self.contradictions[implied]
+            self.conflicts[literal] = conflicts
+        self.dirty = 0
+        return updated
+
+    def take_reach_changes(self):
+        """
+        Returns the literals whose reach has changed since this was last called.
+        """
+        reach_changed = self.reach_changed
+        self.reach_changed = 0
+        return reach_changed
+
+    def leads_to_contradiction(self, literal):
+        return bool(self.reach[literal] & self.conflicts[literal])
+
+    def contradicting_pairs(self, literal):
+        reach = self.reach[literal]
+        return [
+            (l1, l2)
+            for l1 in iter_bits(reach)
+            for l2 in iter_bits(self.contradictions[l1] & reach)
+            if l1 < l2
+        ]
+
+    def snapshot(self):
+        return (
+            self.present,
+            list(self.direct),
+            list(self.parents),
+            list(self.reach),
+            list(self.ancestors),
+            list(self.contradictions),
+            list(self.conflicts),
+            self.dirty,
+            self.reach_changed,
+        )
+
+    def restore(self, snapshot):
+        # Changes made since the snapshot are reported again, even if they have
+        # already been taken, since restoring the reach undoes them
+        reach_changed = self.reach_changed | snapshot[-1]
+        for literal, (reach, old_reach) in enumerate(zip(self.reach, snapshot[3])):
+            if reach != old_reach:
+                reach_changed |= 1 << literal
+        (
+            self.present,
+            self.direct,
+            self.parents,
+            self.reach,
+            self.ancestors,
+            self.contradictions,
+            self.conflicts,
+            self.dirty,
+            self.reach_changed,
+        ) = snapshot
+        self.reach_changed = reach_changed
+
+
+_peer_indices = {}
+
+
+def get_peer_index(board):
+    """
+    Boards with the same NoRepeatsConstraint layout share a PeerIndex.
+    """
+    layout = frozenset(
+        tuple(sorted([cell.index for cell in constraint.cells]))
+        for constraint in board.constraints
+        if isinstance(constraint, NoRepeatsConstraint)
+    )
+    if layout not in _peer_indices:
+        if len(_peer_indices) >= PEER_INDEX_CACHE_SIZE:
+            del _peer_indices[next(iter(_peer_indices))]
+        _peer_indices[layout] = PeerIndex(layout, len(board.cells))
+    return _peer_indices[layout]
+
+
 class Board:
     def __init__(self):
         self.cells = []
         self.constraints = []
+        self.masks = array("H")
         for row in range(1, 10):
             for column in range(1, 10):
                 Cell(self, row, column)
@@ -72,26 +606,60 @@ class Board:
             Column(self, i)
             Box(self, i)
 
-        self.forcing_values = nx.DiGraph()
-        self.forcing_values.add_nodes_from(
-            [(cell, value) for cell in self.cells for value in cell.possibles]
-        )
+        self.implications = ImplicationEngine(9 * len(self.cells))
 
         self.unfinalised_cells = set(self.cells)
-        self.constraints_to_check = deque()
+        self.constraints_to_check = ConstraintScheduler()
         self.attempted_bifurcations = set()
+        self.bifurcation_scoring = "reach"
+        self._bifurcation_targets = None
         self.end_after_bifurcation = True
         self.solution_snapshots = set()
         self.known_pairs = set()
         self.bifurcation_level = 0
+        self.max_bifurcation_level = MAX_BIFURCATION_LEVEL
+        self.bifurcation_count = 0
+        self.bifurcation_limit = BIFURCATION_LIMIT
+        self.deadline = None
+        self.stop_at_first_solution = False
+        self.parallel_bifurcations = 0
+        self.exact_cover_fast_path = True
+        self._bifurcation_pool = None
+        self.events = EventStream()
+        self.profiler = None
         self.previous_bifurcation = None
+        self.modification_count = 0
+        self.check_count = 0
+        self.enumerated_assignments = 0
+        self.eliminations = []
+        self.trail = None
+        # Running totals over quick_bifurcation_check passes, to compare the
+        # literals recomputed per pass with those present
+        self.quick_check_passes = 0
+        self.quick_check_recomputed = 0
+        self.quick_check_present = 0
 
     def __getitem__(self, item):
         return self.get_cell(*item)
 
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_bifurcation_pool"] = None
+        state["events"] = EventStream()
+        state["profiler"] = None
+        return state
+
+    def emit(self, kind, **fields):
+        """
+        Publishes an event at the current bifurcation level. Callers should check
+        self.events first if the fields are costly to build.
+        """
+        if self.events:
+            self.events.publish(Event(kind, self.bifurcation_level, **fields))
+
     def __repr__(self):
         output = ""
-        max_possibles = max([len(cell.possibles) for cell in self.cells])
+        max_possibles = max([POPCOUNT[mask] for mask in self.masks])
         for i, cell in enumerate(self.cells):
             if i == 0:
                 pass
@@ -101,7 +669,7 @@ class Board:
                     output += "-" * ((max_possibles + 1) * 9 + 1) + "\n"
             elif i % 3 == 0:
                 output += "|"
-            output += "".join(map(str, sorted(cell.possibles))).ljust(max_possibles + 1)
+            output += MASK_STRINGS[self.masks[i]].ljust(max_possibles + 1)
         return output
 
     def get_cell(self, row, column):
@@ -111,33 +679,195 @@ class Board:
         return not bool(self.unfinalised_cells)
 
     def add_known_pair(self, c1, c2):
-        self.known_pairs.add((c1, c2))
-        self.known_pairs.add((c2, c1))
+        self.note_known_pair((c1, c2))
+        self.note_known_pair((c2, c1))
+
+    def note_known_pair(self, pair):
+        if pair in self.known_pairs:
+            return
+        self.known_pairs.add(pair)
+        self.record_undo(self.known_pairs.discard, pair)
+
+    def record_undo(self, undo, *args):
+        """
+        While a hypothesis is being tested, remembers how to reverse a change to the
+        board: undo(*args) is called when the trail is rolled back.
+        """
+        if self.trail is not None:
+            self.trail.append((undo, args))
+
+    def undo_trail(self, trail_position):
+        while len(self.trail) > trail_position:
+            undo, args = self.trail.pop()
+            undo(*args)
+
+    def literal_to_cell_value(self, literal):
+        return self.cells[literal // 9], literal % 9 + 1
+
+    # The implication engine is restored from a snapshot when a hypothesis is
+    # rolled back (see _bifurcate_on_cell_and_value), so these don't record undos
+    def add_forcing_edges(self, edges):
+        for (c1, v1), (c2, v2) in edges:
+            self.implications.add_edge(cell_literal(c1, v1), cell_literal(c2, v2))
+
+    def remove_forcing_nodes(self, nodes):
+        self.implications.remove_literals(
+            [cell_literal(cell, value) for cell, value in nodes]
+        )
+
+    def add_contradiction_edges(self, edges):
+        for (c1, v1), (c2, v2) in edges:
+            self.implications.add_contradiction(
+                cell_literal(c1, v1), cell_literal(c2, v2)
+            )
 
     def solve(self):
-        self._initialise_seen_graph()
+        if self.exact_cover_fast_path and self.has_only_classic_constraints():
+            return self._solve_by_exact_cover()
+
+        self._initialise_constraints()
+        try:
+            self.process_constraint_queue()
+        finally:
+            self.close_bifurcation_pool()
+            if self.profiler is not None:
+                self.profiler.solve_finished()
+
+    def has_only_classic_constraints(self):
+        return all(
+            type(constraint) in (Row, Column, Box, GivenDigit, FinaliseConstraint)
+            for constraint in self.constraints
+        )
+
+    def _solve_by_exact_cover(self):
+        """
+        Solves a board with no rules beyond rows, columns, boxes and givens as an
+        exact cover problem, reaching the same verdicts as solve() would.
+        """
+        solutions = sudoku_solutions([MASK_DIGITS[mask] for mask in self.masks])
+        if not solutions:
+            raise NoSolutionFound("No solution could be found!")
+
+        if len(solutions) > 1:
+            for solution in solutions:
+                self.add_solution(self._solution_repr(solution))
+
+        for cell, digit in zip(self.cells, solutions[0]):
+            if not cell.finalised:
+                cell.set_mask(DIGIT_MASKS[digit])
+        for cell in self.cells:
+            cell.finalise()
+
+    def _solution_repr(self, solution):
+        masks = self.masks
+        self.masks = array("H", [DIGIT_MASKS[digit] for digit in solution])
+        try:
+            return self.snapshot()
+        finally:
+            self.masks = masks
+
+    def _initialise_constraints(self):
+        self._initialise_peer_index()
 
         for constraint in sorted(self.constraints, key=lambda c: len(c.cells)):
-            self.constraints_to_check.append(constraint)
             constraint.initialise()
-
-        self.process_constraint_queue()
+        self.constraints_to_check.extend(self.constraints)
+
+    def search(
+        self,
+        max_depth=MAX_SEARCH_DEPTH,
+        bifurcation_limit=BIFURCATION_LIMIT,
+        time_limit=None,
+        scoring="reach",
+    ):
+        """
+        Solves the board with iterative deepening over the bifurcation level: solve
+        logically, then allow hypotheses one level deep, then two, and so on up to
+        max_depth. Stops at the first solution found. Deductions made at one depth
+        are kept for the next.
+
+        Returns a dict of statistics whose "status" is "solved", or "budget
+        exhausted" if max_depth, bifurcation_limit or time_limit (in seconds) ran
+        out first, in which case "reason" is "depth", "bifurcations" or "time".
+        """
+        start_time = time.perf_counter()
+        saved_settings = {name: getattr(self, name) for name in SEARCH_SETTINGS}
+        self.bifurcation_limit = bifurcation_limit
+        self.deadline = None if time_limit is None else start_time + time_limit
+        self.bifurcation_scoring = scoring
+        self.stop_at_first_solution = True
+
+        stats = {"status": "solved", "reason": None, "depth": 0}
+        try:
+            self._initialise_constraints()
+            for depth in range(max_depth + 1):
+                stats["depth"] = depth
+                self.max_bifurcation_level = depth
+                try:
+                    self.process_constraint_queue()
+                    break
+                except NoSolutionFound:
+                    self.emit("search_depth_exhausted", depth=depth)
+                    self.attempted_bifurcations = set()
+                    self._bifurcation_targets = None
+                    self.constraints_to_check.extend(self.constraints)
+            else:
+                stats["status"] = "budget exhausted"
+                stats["reason"] = "depth"
+
+        except SolutionFound as solution:
+            self.max_bifurcation_level = 0
+            for cell in self.cells:
+                cell.intersect_mask(solution.masks[cell.index])
+            self.process_constraint_queue()
+
+        except BudgetExhausted as e:
+            self.emit("budget_exhausted", reason=str(e))
+            stats["status"] = "budget exhausted"
+            stats["reason"] = e.reason
+
+        finally:
+            for name, setting in saved_settings.items():
+                setattr(self, name, setting)
+            self.close_bifurcation_pool()
+            if self.profiler is not None:
+                self.profiler.solve_finished()
+
+        if stats["status"] == "solved":
+            self.add_solution_snapshot(self)
+        stats["bifurcations"] = self.bifurcation_count
+        stats["elapsed"] = time.perf_counter() - start_time
+        stats["unfinalised_cells"] = len(self.unfinalised_cells)
+        return stats
+
+    def check_budget(self):
+        if self.bifurcation_count >= self.bifurcation_limit:
+            raise BudgetExhausted(
+                "Bifurcation limit of {} reached".format(self.bifurcation_limit),
+                "bifurcations",
+            )
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise BudgetExhausted("Time limit reached", "time")
 
     def process_constraint_queue(self, constraint_limit=None):
         with tq(total=self.total_possibles, disable=True) as bar:
             while self.unfinalised_cells:
+                if self.deadline is not None:
+                    self.check_budget()
                 while self.constraints_to_check:
-                    start_snapshot = self.snapshot()
+                    # A propagation round on a variant board can take seconds
+                    if self.deadline is not None:
+                        self.check_budget()
+                    start_count = self.modification_count
                     constraint = self.constraints_to_check.popleft()
+                    start_time = time.perf_counter()
                     constraint.check()
-                    end_snapshot = self.snapshot()
-                    board_changed = end_snapshot != start_snapshot
-
-                    if board_changed:
-                        bar.update(
-                            sum([len(cell) for cell in start_snapshot])
-                            - sum([len(cell) for cell in end_snapshot])
-                        )
+                    elapsed = time.perf_counter() - start_time
+                    eliminations = self.modification_count - start_count
+                    if self.profiler is not None:
+                        self.profiler.record_check(constraint, elapsed, eliminations)
+                    if eliminations:
+                        bar.update(eliminations)
 
                 if self.quick_bifurcation_check():
                     continue
@@ -145,14 +875,21 @@ class Board:
                 if not self.unfinalised_cells:
                     break
 
-                if self.bifurcation_level < MAX_BIFURCATION_LEVEL:
+                if self.bifurcation_level < self.max_bifurcation_level:
                     try:
                         while True:
-                            bifurcation_successful = self.bifurcate()
+                            if (
+                                self.parallel_bifurcations
+                                and not self.bifurcation_level
+                            ):
+                                bifurcation_successful = self.bifurcate_in_parallel()
+                            else:
+                                bifurcation_successful = self.bifurcate()
                             if bifurcation_successful:
                                 break
                     except NoBifurcationsLeft:
                         self.attempted_bifurcations = set()
+                        self._bifurcation_targets = None
                         self.constraints_to_check.extend(self.constraints)
                         self.end_after_bifurcation = True
 
@@ -166,13 +903,14 @@ class Board:
 
     @property
     def total_possibles(self):
-        return sum([len(cell.possibles) for cell in self.cells])
+        return sum([POPCOUNT[mask] for mask in self.masks])
 
     def add_solution_snapshot(self, board):
-        snapshot = board.snapshot()
+        self.add_solution(board.snapshot())
+
+    def add_solution(self, snapshot):
         if snapshot not in self.solution_snapshots:
-            print_msg("Solution found!")
-            print_msg(self)
+            self.emit("solution", snapshot=snapshot)
         self.solution_snapshots.add(snapshot)
         if len(self.solution_snapshots) > 1:
             raise MultipleSolutionsFound(
@@ -182,16 +920,31 @@ class Board:
             )
 
     def quick_bifurcation_check(self):
+        # Literals whose implications and contradictions haven't changed since the
+        # last check can't have started leading to a contradiction
+        updated = self.implications.update_conflicts()
+        recomputed = updated.bit_count()
+        present = self.implications.present.bit_count()
+        self.quick_check_passes += 1
+        self.quick_check_recomputed += recomputed
+        self.quick_check_present += present
+        if self.profiler is not None:
+            self.profiler.record_quick_check(recomputed, present)
         to_remove = []
-        for cell, value in self.forcing_values:
-            out_component = list(nx.bfs_tree(self.forcing_values, (cell, value)))
-            induced_seen_subgraph = self.contradiction_graph.subgraph(out_component)
-            if induced_seen_subgraph.edges():
-                to_remove.append((cell, value))
-                print_msg(
-                    "Assigning {} = {} leads to contradictions: {}. Removing this assignment.".format(
-                        cell, value, list(induced_seen_subgraph.edges())
-                    )
+        for assumed in iter_bits(updated):
+            if not self.implications.leads_to_contradiction(assumed):
+                continue
+            cell, value = self.literal_to_cell_value(assumed)
+            to_remove.append((cell, value))
+            if self.events:
+                self.emit(
+                    "implication_contradiction",
+                    cells=[cell],
+                    digits=[value],
+                    pairs=[
+                        (self.literal_to_cell_value(l1), self.literal_to_cell_value(l2))
+                        for l1, l2 in self.implications.contradicting_pairs(assumed)
+                    ],
                 )
 
         for cell, value in to_remove:
@@ -206,148 +959,472 @@ class Board:
     def snapshot(self):
         return self.__repr__()
 
+    def eliminations_since(self, journal_position):
+        """
+        Returns the (cell, digit) pairs eliminated since len(self.eliminations) was
+        journal_position.
+        """
+        return self.eliminations[journal_position:]
+
     def bifurcate(self):
+        self.check_budget()
         try:
             target_cell, target_value = self._select_bifurcation_target()
 
         except ValueError:
             raise NoSolutionFound("All bifurcations exhausted, no solution found.")
 
-        before_snapshot = self.snapshot()
-        self._bifurcate_on_cell_and_value(target_cell, target_value)
-        return self.snapshot() != before_snapshot
-
-    def common_constraints(self, cells):
-        for constraint in self.constraints:
-            if all([cell in constraint.cells for cell in cells]):
-                yield constraint
+        return self._bifurcate_on_cell_and_value(target_cell, target_value)
 
-    def _bifurcate_on_cell_and_value(self, cell, value):
-        _stdout = sys.stdout
-        bifurcation_stdout = io.StringIO()
-        global msg_indent
-        out_component = list(nx.bfs_tree(self.forcing_values, (cell, value)))
-
-        sys.stdout = bifurcation_stdout
-        print_msg(
-            "Bifurcating on {} = {}".format(
-                cell,
-                value,
+    def bifurcate_in_parallel(self):
+        """
+        Tests the next parallel_bifurcations targets at once in a process pool,
+        then merges the results in the order the targets were selected. Returns
+        True if any value was eliminated.
+        """
+        self.check_budget()
+        targets = []
+        while len(targets) < self.parallel_bifurcations:
+            try:
+                target = self._select_bifurcation_target()
+            except ValueError:
+                break
+            targets.append(target)
+            self.attempted_bifurcations.add(target)
+        if not targets:
+            raise NoSolutionFound("All bifurcations exhausted, no solution found.")
+        self.bifurcation_count += len(targets)
+
+        pool = self._get_bifurcation_pool()
+        settings = {
+            "max_bifurcation_level": self.max_bifurcation_level,
+            "bifurcation_limit": self.bifurcation_limit - self.bifurcation_count,
+            "deadline": self.deadline,
+            "stop_at_first_solution": self.stop_at_first_solution,
+        }
+        record_events = bool(self.events)
+        futures = [
+            pool.submit(
+                _test_hypothesis, self.masks, cell.index, value, settings, record_events
             )
+            for cell, value in targets
+        ]
+        literals = [cell_literal(cell, value) for cell, value in targets]
+
+        # A target that implies a contradicted target must be contradicted too
+        implied_by = {}
+        for future in as_completed(futures):
+            if future.cancelled() or not future.result()[0]:
+                continue
+            contradicted = futures.index(future)
+            for i, assumed in enumerate(literals):
+                if i in implied_by or i == contradicted:
+                    continue
+                if self.implications.reach[assumed] >> literals[contradicted] & 1:
+                    implied_by[i] = contradicted
+                    futures[i].cancel()
+
+        eliminated = False
+        for i, ((cell, value), future) in enumerate(zip(targets, futures)):
+            if i in implied_by:
+                implied_cell, implied_value = targets[implied_by[i]]
+                self.emit(
+                    "implied_contradiction",
+                    cells=[cell, implied_cell],
+                    digits=[value, implied_value],
+                )
+                contradiction, solutions, solution_masks = True, [], None
+            else:
+                contradiction, solutions, solution_masks, bifurcations, events = (
+                    future.result()
+                )
+                self.bifurcation_count += bifurcations
+                for event in events:
+                    # Solutions are published by add_solution below, once each
+                    if event[0] != "solution":
+                        self.events.publish(self._event_from_portable(event))
+            if solution_masks is not None:
+                raise SolutionFound(solution_masks)
+            for snapshot in solutions:
+                self.add_solution(snapshot)
+            if contradiction:
+                cell.remove_possible(value)
+                self.constraints_to_check.extend(cell.constraints)
+                eliminated = True
+
+        return eliminated
+
+    def _event_from_portable(self, portable_event):
+        kind, level, constraint, cells, digits, details = from_portable(
+            self, portable_event
         )
-        self.attempted_bifurcations.add((cell, value))
+        return Event(kind, level, constraint, cells, digits, **details)
+
+    def _get_bifurcation_pool(self):
+        if self._bifurcation_pool is None:
+            self._bifurcation_pool = ProcessPoolExecutor(
+                self.parallel_bifurcations,
+                initializer=_initialise_hypothesis_worker,
+                initargs=(pickle.dumps(self),),
+            )
+        return self._bifurcation_pool
+
+    def close_bifurcation_pool(self):
+        if self._bifurcation_pool is not None:
+            self._bifurcation_pool.shutdown(cancel_futures=True)
+            self._bifurcation_pool = None
+
+    def common_constraints(self, cells):
+        """
+        Yields the constraints containing every one of the cells, in the order they
+        were added, by intersecting the cells' constraint bitsets.
+        """
+        common = (1 << len(self.constraints)) - 1
+        for cell in cells:
+            common &= cell.constraint_bits
+        for index in iter_bits(common):
+            yield self.constraints[index]
 
-        msg_indent += 1
+    def _bifurcate_on_cell_and_value(self, cell, value):
+        """
+        Tests the hypothesis cell = value on this board, rolling every change back
+        afterwards. Returns True if the hypothesis led to a contradiction and value
+        has been eliminated from cell.
+        """
+        assumed = cell_literal(cell, value)
+        out_component = [
+            self.literal_to_cell_value(implied)
+            for implied in iter_bits(self.implications.reach[assumed] | 1 << assumed)
+        ]
 
-        new_board = deepcopy(self)
-        new_board.bifurcation_level = self.bifurcation_level + 1
-        new_given_digits = []
+        self.emit("bifurcation", cells=[cell], digits=[value])
+        self.attempted_bifurcations.add((cell, value))
+        self.bifurcation_count += 1
+
+        outermost_hypothesis = self.trail is None
+        if outermost_hypothesis:
+            self.trail = []
+        trail_position = len(self.trail)
+        self.record_undo(self.implications.restore, self.implications.snapshot())
+        journal_position = len(self.eliminations)
+        saved_queue = self.constraints_to_check.copy()
+        saved_attempted_bifurcations = set(self.attempted_bifurcations)
+        self.bifurcation_level += 1
+        contradiction = None
+        outcome = "abandoned"
         try:
             for forced_cell, forced_value in out_component:
-                new_given_digits.append(
-                    GivenDigit(
-                        new_board,
-                        forced_cell.row,
-                        forced_cell.column,
-                        forced_value,
-                    )
-                )
-            new_board.constraints_to_check.extend(
-                new_board.get_cell(cell.row, cell.column).constraints
-            )
-            new_board.constraints_to_check.extend(
-                new_board.get_cell(cell.row, cell.column).constraints
-            )
-            new_board.process_constraint_queue()
+                forced_cell.intersect_mask(DIGIT_MASKS[forced_value])
+            self.constraints_to_check.extend(cell.constraints)
+            self.process_constraint_queue()
             self.final_constraint_check()  # Solution found if we get to this bit
-            self.add_solution_snapshot(new_board)
-            sys.stdout = bifurcation_stdout
-            print(bifurcation_stdout.getvalue())
+            if self.stop_at_first_solution:
+                raise SolutionFound(array("H", self.masks))
+            self.add_solution_snapshot(self)
+            outcome = "solution"
 
         except SudokuContradiction as e:
-            print_msg(
-                "Contradiction found: {}. {} eliminated for {}".format(e, value, cell),
-                indent_override=0,
+            contradiction = e
+            outcome = "contradiction"
+
+        except NoSolutionFound as e:
+            outcome = "no_contradiction"
+
+        finally:
+            self.undo_trail(trail_position)
+            if outermost_hypothesis:
+                self.trail = None
+            self._rollback_bifurcation_targets(
+                journal_position,
+                self.attempted_bifurcations - saved_attempted_bifurcations,
             )
-            sys.stdout = _stdout
-            print(bifurcation_stdout.getvalue())
-            sys.stdout.flush()
+            del self.eliminations[journal_position:]
+            self.constraints_to_check = saved_queue
+            self.attempted_bifurcations = saved_attempted_bifurcations
+            self.bifurcation_level -= 1
+            if self.events:
+                # Exceptions other than contradictions abandon the hypothesis
+                self.emit(
+                    "bifurcation_result",
+                    cells=[cell],
+                    digits=[value],
+                    outcome=outcome,
+                    reason=str(contradiction or sys.exc_info()[1]),
+                )
+
+        if contradiction is not None:
             cell.remove_possibles([value])
             self.constraints_to_check.extend(cell.constraints)
 
-        except NoSolutionFound as e:
-            print_msg(
-                "No contradiction or solution found for {} = {}".format(cell, value)
-            )
+        return contradiction is not None
 
-        msg_indent -= 1
+    def _initialise_peer_index(self):
+        self.peer_index = get_peer_index(self)
+        self.implications.add_contradictions(self.peer_index.literal_contradictions)
 
-        sys.stdout = _stdout
+    def sees(self, c1, c2):
+        return self.peer_index.peers[c1.index] >> c2.index & 1
 
-    def _initialise_seen_graph(self):
-        self.seen_graph = nx.Graph()
-        for cell in self.cells:
-            self.seen_graph.add_node(cell)
+    def bifurcation_target_score(self, target):
+        """
+        Score of the target literal under self.bifurcation_scoring: "reach" counts
+        the literals it implies, "cell" uses Cell.bifurcation_score.
+        """
+        if self.bifurcation_scoring == "cell":
+            return self.cells[target // 9].bifurcation_score
+        return self.implications.reach[target].bit_count()
 
-        for c1, c2 in itertools.combinations(self.cells, 2):
-            common_constraints = [
-                constraint
-                for constraint in c1.constraints
-                if constraint in c2.constraints
-                and issubclass(type(constraint), NoRepeatsConstraint)
-            ]
-            if len(common_constraints) > 0:
-                self.seen_graph.add_edge(c1, c2)
+    def _select_bifurcation_target(self):
+        """
+        Returns the unattempted (cell, value) with the highest score, preferring
+        earlier cells and lower values on a tie. Raises ValueError if there are
+        none left.
+        """
+        self._update_bifurcation_targets()
+        heap, scores = self._bifurcation_targets
+        while heap:
+            negative_score, target = heappop(heap)
+            if scores.get(target) != -negative_score:
+                continue  # Rescored or no longer a candidate
+            del scores[target]
+            cell, value = self.literal_to_cell_value(target)
+            if self._is_bifurcation_candidate(cell, value):
+                return cell, value
+        raise ValueError("No bifurcation targets left")
+
+    def _is_bifurcation_candidate(self, cell, value):
+        mask = self.masks[cell.index]
+        return (
+            POPCOUNT[mask] > 1
+            and mask & DIGIT_MASKS[value]
+            and (cell, value) not in self.attempted_bifurcations
+        )
 
-        self.contradiction_graph = nx.Graph()
-        for cell in self.cells:
-            self.contradiction_graph.add_node(cell)
+    def _update_bifurcation_targets(self):
+        """
+        Pushes fresh scores for the literals whose score may have changed since
+        the last selection. Outdated heap entries are skipped when popped.
+        """
+        if self._bifurcation_targets is None:
+            self._bifurcation_targets = ([], {})
+            self._targets_journal_position = 0
+            self._targets_to_rescore = (1 << 9 * len(self.cells)) - 1
+            self.implications.take_reach_changes()
+
+        to_rescore = self._targets_to_rescore | self.implications.take_reach_changes()
+        for cell, _ in self.eliminations_since(self._targets_journal_position):
+            to_rescore |= self._literals_affected_by(cell)
+        self._targets_journal_position = len(self.eliminations)
+        self._targets_to_rescore = 0
+
+        heap, scores = self._bifurcation_targets
+        for target in iter_bits(to_rescore):
+            if not self._is_bifurcation_candidate(*self.literal_to_cell_value(target)):
+                scores.pop(target, None)
+                continue
+            score = self.bifurcation_target_score(target)
+            if scores.get(target) != score:
+                scores[target] = score
+                heappush(heap, (-score, target))
 
-        for c1, c2 in self.seen_graph.edges():
-            for value in range(1, 10):
-                self.contradiction_graph.add_edge((c1, value), (c2, value))
+    def _literals_affected_by(self, cell):
+        """
+        Literals whose score can change when the candidates in cell change.
+        """
+        if self.bifurcation_scoring == "cell":
+            return self.peer_index.peer_literals[cell.index]
+        return ALL_DIGITS_MASK << 9 * cell.index
 
-        for cell in self.cells:
-            for v1, v2 in itertools.combinations(range(1, 10), 2):
-                self.contradiction_graph.add_edge((cell, v1), (cell, v2))
+    def _rollback_bifurcation_targets(self, journal_position, attempted):
+        """
+        Marks for rescoring the targets touched by a hypothesis that is being rolled
+        back: cells it changed and targets attempted within it.
+        """
+        if self._bifurcation_targets is None:
+            return
+        for cell, _ in self.eliminations_since(journal_position):
+            self._targets_to_rescore |= self._literals_affected_by(cell)
+        for cell, value in attempted:
+            self._targets_to_rescore |= 1 << cell_literal(cell, value)
+        self._targets_journal_position = min(
+            self._targets_journal_position, journal_position
+        )
 
-    def _select_bifurcation_target(self):
-        possible_targets = {}
-        for cell in self.cells:
-            if len(cell.possibles) == 1:
-                continue
-            for value in cell.possibles:
-                target = (cell, value)
-                if target in self.attempted_bifurcations:
-                    continue
-                possible_targets[target] = len(nx.bfs_tree(self.forcing_values, target))
 
-        return max(
-            possible_targets,
-            key=possible_targets.get,
+class PortableReference(namedtuple("PortableReference", ["kind", "index"])):
+    """
+    Stands in for a cell or constraint, by its index in the board's list, in data
+    sent between processes.
+    """
+
+
+def to_portable(board, data):
+    if isinstance(data, PortableReference):
+        return data
+    if isinstance(data, Cell):
+        return PortableReference("cell", data.index)
+    if isinstance(data, Constraint):
+        return PortableReference("constraint", board.constraints.index(data))
+    if isinstance(data, (list, tuple)):
+        return type(data)(to_portable(board, item) for item in data)
+    if isinstance(data, dict):
+        return {key: to_portable(board, value) for key, value in data.items()}
+    return data
+
+
+def from_portable(board, data):
+    if isinstance(data, PortableReference):
+        if data.kind == "cell":
+            return board.cells[data.index]
+        return board.constraints[data.index]
+    if isinstance(data, (list, tuple)):
+        return type(data)(from_portable(board, item) for item in data)
+    if isinstance(data, dict):
+        return {key: from_portable(board, value) for key, value in data.items()}
+    return data
+
+
+_worker_board = None
+
+
+def _initialise_hypothesis_worker(board_template):
+    global _worker_board
+    _worker_board = pickle.loads(board_template)
+
+
+def _test_hypothesis(masks, cell_index, value, settings, record_events):
+    """
+    Runs in a bifurcation pool worker: narrows the worker's board to masks, tests
+    cell = value on it and rolls everything back. settings are Board attributes to
+    use for the test. Returns whether value was eliminated, any solutions found,
+    the solved masks if the board stops at the first solution, the number of
+    nested bifurcations and, if record_events, the events published in portable
+    form.
+    """
+    board = _worker_board
+    for name, setting in settings.items():
+        setattr(board, name, setting)
+    board.bifurcation_count = -1  # Not counting the hypothesis itself
+    board.trail = []
+    board.record_undo(board.implications.restore, board.implications.snapshot())
+    journal_position = len(board.eliminations)
+    saved_queue = board.constraints_to_check.copy()
+    board.attempted_bifurcations = set()
+    board._bifurcation_targets = None
+    board.solution_snapshots = set()
+    board.events = EventStream()
+    recorder = EventRecorder()
+    if record_events:
+        board.events.subscribe(recorder)
+
+    contradiction = False
+    solution_masks = None
+    try:
+        for cell in board.cells:
+            cell.remove_mask(ALL_DIGITS_MASK & ~masks[cell.index])
+        contradiction = board._bifurcate_on_cell_and_value(
+            board.cells[cell_index], value
         )
+    except SolutionFound as solution:
+        solution_masks = solution.masks
+    finally:
+        board.undo_trail(0)
+        board.trail = None
+        del board.eliminations[journal_position:]
+        board.constraints_to_check = saved_queue
+
+    return (
+        contradiction,
+        list(board.solution_snapshots),
+        solution_masks,
+        board.bifurcation_count,
+        [
+            to_portable(
+                board,
+                (
+                    event.kind,
+                    event.level,
+                    event.constraint,
+                    event.cells,
+                    event.digits,
+                    event.details,
+                ),
+            )
+            for event in recorder.events
+        ],
+    )
+
+
+class AssignmentCache:
+    """
+    Bounded LRU mapping from a constraint's inputs (see
+    Constraint.assignment_cache_key) to the assignments enumerated for them.
+    """
+
+    def __init__(self, max_size=ASSIGNMENT_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
 
 
 class Constraint:
     def __init__(self, board, cells):
         self.board = board
         self.cells = list(cells)
+        # Position in board.constraints, indexing the cells' constraint_bits
+        self.board_index = len(board.constraints)
+        # Product of the cells' candidate counts, kept up to date by Cell.set_mask
+        self.candidate_product = 1
         for cell in self.cells:
             cell.constraints.append(self)
+            cell.constraint_bits |= 1 << self.board_index
+            self.candidate_product *= CANDIDATE_FACTORS[board.masks[cell.index]]
         board.constraints.append(self)
         self.corner_marks = {}
+        self.assignment_cache = AssignmentCache()
+        self.last_update_key = None
 
     def add_corner_mark(self, digit, cells):
         """
         Returns True if any possibilities have changed as a result of this pencil mark
         """
-        print_msg("Adding {} corner mark to {} in {}".format(digit, cells, self))
-        start_snapshot = self.snapshot_possibles()
+        if self.board.events:
+            # A copy, as the marked cells are removed and restored in place later
+            self.board.emit(
+                "corner_mark", constraint=self, cells=list(cells), digits=[digit]
+            )
+        start_count = self.board.modification_count
+        self.board.record_undo(
+            self._restore_corner_mark, digit, self.corner_marks.get(digit)
+        )
         self.corner_marks[digit] = cells
         self.process_corner_mark(digit, cells)
-        end_snapshot = self.snapshot_possibles()
 
-        return start_snapshot != end_snapshot
+        return self.board.modification_count != start_count
+
+    def _restore_corner_mark(self, digit, cells):
+        if cells is None:
+            del self.corner_marks[digit]
+        else:
+            self.corner_marks[digit] = cells
 
     def assignment_violates_corner_marks(self, assignment):
         for digit, cells in self.corner_marks.items():
@@ -360,41 +1437,76 @@ class Constraint:
         Assignment is a dict of Cells to values, returns a boolean showing if this is valid
         """
         for c1, c2 in itertools.combinations(self.cells, 2):
-            if c1 in self.board.seen_graph[c2] and assignment.get(
+            if self.board.sees(c1, c2) and assignment.get(
                 c1, "C1 absent"
             ) == assignment.get(c2, "C2 absent"):
                 return True
 
         return self.assignment_violates_corner_marks(assignment)
 
+    def initial_assignment_state(self):
+        """
+        Running state for extend_assignment before any cell is assigned. Here it is
+        a bitset of the indices of the cells assigned so far.
+        """
+        return 0
+
+    def extend_assignment(self, assignment, state, cell, value):
+        """
+        Incremental partial_assignment_invalid, called as enumeration assigns value
+        to cell. assignment holds the cells assigned before it and state is the
+        running state for them. Returns the running state with cell assigned, or
+        None if the extended assignment is invalid.
+        """
+        cells = self.board.cells
+        for index in iter_bits(self.board.peer_index.peers[cell.index] & state):
+            if assignment[cells[index]] == value:
+                return None
+
+        for digit, marked_cells in self.corner_marks.items():
+            if value == digit or cell not in marked_cells:
+                continue
+            if all(
+                other is cell
+                or (state >> other.index & 1 and assignment[other] != digit)
+                for other in marked_cells
+            ):
+                return None
+        return state | 1 << cell.index
+
     def update_all_corner_marks(self, cell):
         for digit, cells in self.corner_marks.items():
             if cell not in cells:
                 continue
 
-            if digit not in cell.possibles:
+            if not cell.possibles_mask & DIGIT_MASKS[digit]:
+                self.board.record_undo(cells.insert, cells.index(cell), cell)
                 cells.remove(cell)
 
             if len(cells) == 1:
-                if len(cells[0].possibles) > 1:
-                    print_msg(
-                        "The {} in {} can only go in {}".format(digit, self, cells[0])
+                if POPCOUNT[cells[0].possibles_mask] > 1:
+                    self.board.emit(
+                        "hidden_single",
+                        constraint=self,
+                        cells=[cells[0]],
+                        digits=[digit],
                     )
-                cells[0].intersect_possibles(
-                    {
-                        digit,
-                    }
-                )
+                cells[0].intersect_mask(DIGIT_MASKS[digit])
                 self.board.constraints_to_check.appendleft(cells[0].finalise_constraint)
             elif len(cells) == 2:
                 c1, c2 = cells
-                for value in c1.possibles:
-                    if value != digit:
-                        self.board.forcing_values.add_edge((c1, value), (c2, digit))
-
-                for value in c2.possibles:
-                    if value != digit:
-                        self.board.forcing_values.add_edge((c2, value), (c1, digit))
+                self.board.add_forcing_edges(
+                    [
+                        ((c1, value), (c2, digit))
+                        for value in c1.possibles
+                        if value != digit
+                    ]
+                    + [
+                        ((c2, value), (c1, digit))
+                        for value in c2.possibles
+                        if value != digit
+                    ]
+                )
 
             # Check if other constraints' pencil marks need
             # updating.
@@ -404,29 +1516,33 @@ class Constraint:
                 if not isinstance(constraint, NoRepeatsConstraint):
                     continue
                 for cell in constraint.cells:
-                    if cell not in cells and digit in cell.possibles:
-                        cell.remove_possible(digit)
+                    if cell not in cells:
+                        cell.remove_mask(DIGIT_MASKS[digit])
 
     def check(self):
-        start_snapshot = self.snapshot_possibles()
+        self.board.check_count += 1
+        start_count = self.board.modification_count
         try:
             if hasattr(self, "quick_update"):
                 self.quick_update()
 
             self.process_check()
 
-            end_snapshot = self.snapshot_possibles()
-
             # print(
             #     "Checking {} (Queue size {})".format(
             #         self.name, len(self.board.constraints_to_check)
             #     )
             # )
-            if start_snapshot != end_snapshot:
-                print_msg("Change detected checking {}".format(self.name))
-                for cell in self.cells:
-                    print_msg(
-                        "  New possibles for {} are {}".format(cell, cell.possibles)
+            if self.board.modification_count != start_count:
+                if self.board.events:
+                    masks = self.board.masks
+                    self.board.emit(
+                        "constraint_change",
+                        constraint=self,
+                        cells=list(self.cells),
+                        possibles=[
+                            MASK_DIGITS[masks[cell.index]] for cell in self.cells
+                        ],
                     )
                 return True
 
@@ -434,9 +1550,10 @@ class Constraint:
         except KeyboardInterrupt:
             raise
         except Exception as e:
-            print_msg(
-                "Exception raised checking {}:\n\n {}".format(self.name, format_exc())
-            )
+            if self.board.events:
+                self.board.emit(
+                    "constraint_exception", constraint=self, traceback=format_exc()
+                )
             raise e
 
     def process_check(self):
@@ -454,79 +1571,205 @@ class Constraint:
             cell.intersect_possibles(valid_possibles)
 
     def update_possibles(self):
-        all_possible_assignments = self.get_all_possible_assignments()
-        if all_possible_assignments is None:
+        update_key = self.assignment_cache_key()
+        if update_key == self.last_update_key:
             return
-        for cell in self.cells:
-            possibles = set()
-            possibles.update(
-                (assignment_dict[cell] for assignment_dict in all_possible_assignments)
-            )
-            cell.intersect_possibles(possibles)
 
-        # Note cell values that force other cell values
-        dependency_graph = nx.Graph()
-        for assignment in all_possible_assignments:
-            for a1, a2 in itertools.combinations(assignment.items(), 2):
-                if len(a1[0].possibles) == 1 or len(a2[0].possibles) == 1:
-                    continue
-                dependency_graph.add_edge(a1, a2)
+        assignment_matrix = self.get_assignment_matrix()
+        if assignment_matrix is None:
+            return
+        self.board.record_undo(setattr, self, "last_update_key", self.last_update_key)
+        self.last_update_key = update_key
+        for cell, column in zip(self.cells, assignment_matrix.T):
+            cell.intersect_mask(column_mask(column))
+
+        # Note cell values that force other cell values, and values that never
+        # occur together
+        masks = self.board.masks
+        forced_edges = []
+        never_co_occur_edges = []
+        for (i, c1), (j, c2) in itertools.combinations(enumerate(self.cells), 2):
+            c1_mask = masks[c1.index]
+            c2_mask = masks[c2.index]
+            if POPCOUNT[c1_mask] == 1 or POPCOUNT[c2_mask] == 1:
+                continue
 
-        for c1, c2 in itertools.combinations(self.cells, 2):
-            c1_nodes = [(c1, p) for p in c1.possibles]
-            c2_nodes = [(c2, p) for p in c2.possibles]
-            subgraph = dependency_graph.subgraph(c1_nodes + c2_nodes)
-            forcing_nodes = [v for v in subgraph if subgraph.degree(v) == 1]
-            forced_edges = [(v, list(subgraph[v])[0]) for v in forcing_nodes]
-            self.board.forcing_values.add_edges_from(forced_edges)
+            c1_values = MASK_DIGITS[c1_mask]
+            c2_values = MASK_DIGITS[c2_mask]
+            co_occurrences = co_occurrence_table(
+                assignment_matrix[:, i], assignment_matrix[:, j]
+            )[np.ix_(c1_values, c2_values)]
+
+            for row in np.flatnonzero(co_occurrences.sum(axis=1) == 1).tolist():
+                c2_value = c2_values[co_occurrences[row].argmax()]
+                forced_edges.append(((c1, c1_values[row]), (c2, c2_value)))
+            for column in np.flatnonzero(co_occurrences.sum(axis=0) == 1).tolist():
+                c1_value = c1_values[co_occurrences[:, column].argmax()]
+                forced_edges.append(((c2, c2_values[column]), (c1, c1_value)))
+            for row, column in np.argwhere(~co_occurrences).tolist():
+                never_co_occur_edges.append(
+                    ((c1, c1_values[row]), (c2, c2_values[column]))
+                )
 
-        never_co_occur_graph = nx.complement(dependency_graph)
-        self.board.contradiction_graph.add_edges_from(never_co_occur_graph.edges())
+        self.board.add_forcing_edges(forced_edges)
+        self.board.add_contradiction_edges(never_co_occur_edges)
 
     def get_all_possible_assignments(self):
-        possibles_for_cells = [cell.possibles for cell in self.cells]
-        if (
-            np.prod([len(possibles) for possibles in possibles_for_cells])
-            > ALL_POSSIBLE_ASSIGNMENTS_LIMIT
-        ):
+        assignment_matrix = self.get_assignment_matrix()
+        if assignment_matrix is None:
             return
+        return [dict(zip(self.cells, row)) for row in assignment_matrix.tolist()]
 
-        all_possible_assignments = []
-
-        def recurse_assignments(current_assignment={}):
+    def get_assignment_matrix(self):
+        """
+        Returns every valid assignment as a 2-D array with one row per assignment and
+        one column per cell, or None if there are too many candidates to enumerate.
+        """
+        if self.candidate_product > ALL_POSSIBLE_ASSIGNMENTS_LIMIT:
+            if self.board.profiler is not None:
+                self.board.profiler.record_limit_skip(self)
+            return
 
-            possible_pivots = [
-                cell for cell in self.cells if cell not in current_assignment
+        masks = self.board.masks
+        cell_masks = [masks[cell.index] for cell in self.cells]
+        cache_key = self.assignment_cache_key()
+        assignment_matrix = self.assignment_cache.get(cache_key)
+        if assignment_matrix is not None:
+            return assignment_matrix
+
+        if self.uses_extensional_table():
+            table = get_extensional_table(self)
+            supported = np.all(
+                DIGIT_BITS[table] & np.array(cell_masks, dtype=np.int64), axis=1
+            )
+            assignment_matrix = table[supported]
+            assignment_matrix = assignment_matrix[
+                ~self.batch_violates_corner_marks(assignment_matrix)
+            ]
+        elif has_batch_predicate(type(self)):
+            assignment_matrix = cartesian_product(
+                [MASK_DIGITS[mask] for mask in cell_masks]
+            )
+            assignment_matrix = assignment_matrix[
+                ~self.batch_assignments_invalid(assignment_matrix)
             ]
+        else:
+            assignment_matrix = self.enumerate_assignments()
+        self.board.enumerated_assignments += len(assignment_matrix)
+        if self.board.profiler is not None:
+            self.board.profiler.record_enumeration(self, len(assignment_matrix))
+
+        if len(assignment_matrix) == 0:
+            raise SudokuContradiction(
+                "The constraint {} can no longer be satisfied with possibles {} and pencil marks {}".format(
+                    self,
+                    [set(cell.possibles) for cell in self.cells],
+                    self.corner_marks,
+                )
+            )
+
+        self.assignment_cache.put(cache_key, assignment_matrix)
+        return assignment_matrix
+
+    def table_params(self):
+        """
+        Constraints whose valid assignments depend only on their type, their number
+        of cells and a few parameters return those parameters as a tuple. Such
+        constraints with few enough cells filter a precomputed table of allowed
+        assignments against the candidates instead of enumerating.
+        """
+        return None
+
+    def uses_extensional_table(self):
+        return (
+            len(self.cells) <= EXTENSIONAL_TABLE_MAX_CELLS
+            and self.table_params() is not None
+        )
+
+    def enumerate_assignments(self):
+        """
+        Fallback for constraints without a batch predicate: builds the assignment
+        matrix cell by cell. Constraints with an incremental check validate each
+        new cell with extend_assignment, others recheck the whole partial
+        assignment with partial_assignment_invalid.
+        """
+        rows = []
+        assignment = {}
+        incremental = has_incremental_check(type(self))
+
+        def recurse_assignments(state):
+            possible_pivots = [cell for cell in self.cells if cell not in assignment]
             if len(possible_pivots) == 0:
                 return
             pivot_cell = min(
                 possible_pivots,
-                key=lambda cell: len(cell.possibles),
+                key=lambda cell: POPCOUNT[cell.possibles_mask],
             )
 
             for possible in pivot_cell.possibles:
-                new_assignment = {k: v for k, v in current_assignment.items()}
-                new_assignment[pivot_cell] = possible
-                if not self.partial_assignment_invalid(new_assignment):
-                    if len(new_assignment) == len(self.cells):
-                        all_possible_assignments.append(new_assignment)
+                if incremental:
+                    new_state = self.extend_assignment(
+                        assignment, state, pivot_cell, possible
+                    )
+                    assignment[pivot_cell] = possible
+                    valid = new_state is not None
+                else:
+                    new_state = None
+                    assignment[pivot_cell] = possible
+                    valid = not self.partial_assignment_invalid(assignment)
+                if valid:
+                    if len(assignment) == len(self.cells):
+                        rows.append([assignment[cell] for cell in self.cells])
                     else:
-                        recurse_assignments(new_assignment)
+                        recurse_assignments(new_state)
+                del assignment[pivot_cell]
 
-        recurse_assignments()
+        recurse_assignments(self.initial_assignment_state() if incremental else None)
 
-        if len(all_possible_assignments) == 0:
-            raise SudokuContradiction(
-                "The constraint {} can no longer be satisfied with possibles {} and pencil marks {}".format(
-                    self, possibles_for_cells, self.corner_marks
-                )
-            )
+        return np.array(rows, dtype=np.int8).reshape(-1, len(self.cells))
+
+    def batch_assignments_invalid(self, assignment_matrix):
+        """
+        Vectorised partial_assignment_invalid for complete assignments: returns a
+        boolean array marking the invalid rows of assignment_matrix.
+        """
+        invalid = np.zeros(len(assignment_matrix), dtype=bool)
+        for i, j in itertools.combinations(range(len(self.cells)), 2):
+            if self.board.sees(self.cells[i], self.cells[j]):
+                invalid |= assignment_matrix[:, i] == assignment_matrix[:, j]
 
-        return all_possible_assignments
+        return invalid | self.batch_violates_corner_marks(assignment_matrix)
 
-    def snapshot_possibles(self):
-        return tuple([cell.snapshot_possibles() for cell in self.cells])
+    def batch_violates_corner_marks(self, assignment_matrix):
+        violates = np.zeros(len(assignment_matrix), dtype=bool)
+        for digit, cells in self.corner_marks.items():
+            if not all([cell in self.cells for cell in cells]):
+                continue
+            columns = [self.cells.index(cell) for cell in cells]
+            violates |= ~np.any(assignment_matrix[:, columns] == digit, axis=1)
+        return violates
+
+    def estimated_cost(self):
+        """
+        Number of candidate combinations an enumeration would visit. Constraints
+        with more than ALL_POSSIBLE_ASSIGNMENTS_LIMIT skip enumeration, leaving only
+        their quick_update, so they count as cheap.
+        """
+        if self.candidate_product > ALL_POSSIBLE_ASSIGNMENTS_LIMIT:
+            return 1
+        return self.candidate_product
+
+    def assignment_cache_key(self):
+        masks = self.board.masks
+        return (
+            tuple([masks[cell.index] for cell in self.cells]),
+            tuple(
+                [
+                    (digit, tuple([cell.index for cell in cells]))
+                    for digit, cells in sorted(self.corner_marks.items())
+                ]
+            ),
+        )
 
     def __repr__(self):
         return self.name
@@ -534,14 +1777,20 @@ class Constraint:
     def __hash__(self):
         return hash(self.name)
 
+    def __reduce__(self):
+        return _unpickle_hashable, (type(self), {"name": self.name}), self.__dict__
+
 
 class FinaliseConstraint(Constraint):
     def __init__(self, board, cell):
         super().__init__(board, [cell])
         self.name = "Finalise {}".format(cell)
 
+    def estimated_cost(self):
+        return 1
+
     def process_check(self):
-        if len(self.cells[0].possibles) == 1:
+        if POPCOUNT[self.cells[0].possibles_mask] == 1:
             self.cells[0].finalise()
 
     def partial_assignment_invalid(self, assignment):
@@ -557,6 +1806,21 @@ class NoRepeatsConstraint(Constraint):
         output = len(set(assignment.values())) != len(assignment)
         return output
 
+    def initial_assignment_state(self):
+        """
+        The running state is a mask of the digits used so far.
+        """
+        return 0
+
+    def extend_assignment(self, assignment, state, cell, value):
+        if state & DIGIT_MASKS[value]:
+            return None
+        return state | DIGIT_MASKS[value]
+
+    def batch_assignments_invalid(self, assignment_matrix):
+        ordered = np.sort(assignment_matrix, axis=1)
+        return np.any(ordered[:, 1:] == ordered[:, :-1], axis=1)
+
     def initialise(self):
         super().initialise()
         self._initialise_corner_marks()
@@ -564,103 +1828,177 @@ class NoRepeatsConstraint(Constraint):
     def process_check(self):
         self.remove_finalised()
 
-        for n in range(1, 9 - len([cell for cell in self.cells if cell.finalised])):
-            self.check_for_corner_mark_tuples(n)
-            self.detect_and_action_n_tuples(n)
+        # In a full region a naked subset's complement is a hidden subset and vice
+        # versa, so between them subsets of up to half the cells find everything
+        cells = [cell for cell in self.cells if not cell.finalised]
+        limit = len(cells) // 2 if len(self.cells) == 9 else len(cells) - 1
+        self.find_hidden_subsets(cells, limit)
+        self.find_naked_subsets(cells, limit)
 
         super().process_check()
 
+    def estimated_cost(self):
+        if self.candidate_product > ALL_POSSIBLE_ASSIGNMENTS_LIMIT:
+            # Enumeration will be skipped, leaving the subset search
+            return 2 ** len(self.cells)
+        return self.candidate_product
+
     def remove_finalised(self):
         finalised_digits = {cell.value for cell in self.cells if cell.finalised}
 
         for cell in self.cells:
             cell.remove_possibles(finalised_digits)
 
-    def check_for_corner_mark_tuples(self, n):
-        if len(self.corner_marks) <= n:
-            return
-
-        for marks in itertools.combinations(self.corner_marks, n):
-            all_cells = {cell for mark in marks for cell in self.corner_marks[mark]}
-            if len(all_cells) <= n:
-                start_snapshot = self.snapshot_possibles()
-                for cell in all_cells:
-                    cell.intersect_possibles(marks)
-                if start_snapshot != self.snapshot_possibles():
-                    print_msg(
-                        "Pencil marks tell me that cells {} must be from {}.".format(
-                            ", ".join(map(str, all_cells)), ", ".join(map(str, marks))
-                        )
-                    )
-
-    def detect_and_action_n_tuples(self, n):
+    def find_hidden_subsets(self, cells, limit):
         """
-        If repeats are allowed in this constraint, detect pairs, triples etc and remove possibles
-        accordingly.
+        Finds sets of n digits that must be placed in this constraint but fit in
+        only n of its cells, and restricts those cells to them. In a full region
+        every unplaced digit must be placed; otherwise only corner marked digits
+        are.
         """
-        unfinalised_cells = [cell for cell in self.cells if not cell.finalised]
+        masks = self.board.masks
+        if len(self.cells) == 9:
+            required = 0
+            for cell in cells:
+                required |= masks[cell.index]
+        else:
+            placed = digits_to_mask(
+                [cell.value for cell in self.cells if cell.finalised]
+            )
+            required = digits_to_mask(self.corner_marks) & ~placed
+
+        digits = MASK_DIGITS[required]
+        places = [
+            sum(
+                [
+                    1 << i
+                    for i, cell in enumerate(cells)
+                    if masks[cell.index] & DIGIT_MASKS[digit]
+                ]
+            )
+            for digit in digits
+        ]
+
+        def search(start, digits_mask, size, places_union):
+            for i in range(start, len(digits)):
+                union = places_union | places[i]
+                place_count = union.bit_count()
+                if place_count > limit:
+                    continue
+                subset_mask = digits_mask | DIGIT_MASKS[digits[i]]
+                if place_count <= size + 1:
+                    self.action_hidden_subset(
+                        [cells[j] for j in iter_bits(union)], subset_mask, cells
+                    )
+                elif size + 1 < limit:
+                    search(i + 1, subset_mask, size + 1, union)
 
-        for combination in itertools.combinations(unfinalised_cells, n):
-            combination = tuple(sorted(combination))
-            complement_combination = tuple(
-                sorted(
-                    [
-                        cell
-                        for cell in self.cells
-                        if not cell.finalised and not cell in combination
-                    ]
+        search(0, 0, 0, 0)
+
+    def action_hidden_subset(self, subset_cells, subset_mask, unfinalised_cells):
+        if len(subset_cells) < POPCOUNT[subset_mask]:
+            raise SudokuContradiction(
+                "{} can't all be placed in {} in {}".format(
+                    MASK_DIGITS[subset_mask], subset_cells, self
                 )
             )
-            if combination in self.tuples_noted:
-                continue
+        start_count = self.board.modification_count
+        for cell in subset_cells:
+            cell.intersect_mask(subset_mask)
+        if self.board.modification_count != start_count:
+            self.board.emit(
+                "pencil_mark_tuple",
+                constraint=self,
+                cells=subset_cells,
+                digits=list(MASK_DIGITS[subset_mask]),
+            )
+        if len(self.cells) == 9:
+            self.note_tuple(subset_cells)
+            self.note_tuple(
+                [cell for cell in unfinalised_cells if cell not in subset_cells]
+            )
 
-            if any((cell.finalised for cell in combination)):
-                continue
-            all_possibles = {
-                possible for cell in combination for possible in cell.possibles
-            }
-            if len(all_possibles) <= n:
-                start_snapshot = self.snapshot_possibles()
-                for cell in self.cells:
-                    if cell not in combination:
-                        try:
-                            cell.remove_possibles(all_possibles)
-                        except Exception as e:
-                            print_msg(
-                                "{} {} found in {}".format(
-                                    "".join(map(str, sorted(all_possibles))),
-                                    N_TUPLE_NAMES[n],
-                                    self.name,
-                                )
-                            )
-                            raise e
-
-                if self.snapshot_possibles() != start_snapshot:
-                    if len(complement_combination) > 1:
-                        print_msg(
-                            "{} {} found in {}".format(
-                                "".join(map(str, sorted(all_possibles))),
-                                N_TUPLE_NAMES[n],
-                                self.name,
-                            )
-                        )
-                    else:
-                        possibles = {
-                            possible
-                            for possible in complement_combination[0].possibles
-                            if possible not in all_possibles
-                        }
-                        print_msg(
-                            "Where can the {} go in {}?".format(min(possibles), self)
-                        )
-                self.note_tuple(combination)
-                self.note_tuple(complement_combination)
+    def find_naked_subsets(self, cells, limit):
+        """
+        Finds sets of n cells that between them can only hold n digits, and removes
+        those digits from the constraint's other cells. Sets containing a subset
+        already noted are skipped, as the rest of such a set is found separately.
+        """
+        masks = self.board.masks
+        positions = {cell: i for i, cell in enumerate(cells)}
+        known = []
+        for noted in self.tuples_noted:
+            if all([cell in positions for cell in noted]):
+                known.append(sum([1 << positions[cell] for cell in noted]))
+
+        def search(start, chosen_bits, size, candidates):
+            for i in range(start, len(cells)):
+                bits = chosen_bits | 1 << i
+                if any([bits & subset == subset for subset in known]):
+                    continue
+                union = candidates | masks[cells[i].index]
+                if POPCOUNT[union] > limit:
+                    continue
+                if POPCOUNT[union] <= size + 1:
+                    self.action_naked_subset(
+                        [cells[j] for j in iter_bits(bits)], union, cells
+                    )
+                    known.append(bits)
+                elif size + 1 < limit:
+                    search(i + 1, bits, size + 1, union)
+
+        search(0, 0, 0, 0)
+
+    def action_naked_subset(self, combination, combination_mask, unfinalised_cells):
+        combination = tuple(combination)
+        complement_combination = tuple(
+            [cell for cell in unfinalised_cells if cell not in combination]
+        )
+        tuple_name = N_TUPLE_NAMES[len(combination)]
+        start_count = self.board.modification_count
+        for cell in self.cells:
+            if cell not in combination:
+                try:
+                    cell.remove_mask(combination_mask)
+                except Exception as e:
+                    self.board.emit(
+                        "naked_tuple",
+                        constraint=self,
+                        cells=combination,
+                        digits=MASK_DIGITS[combination_mask],
+                        tuple_name=tuple_name,
+                    )
+                    raise e
+
+        if self.board.modification_count != start_count:
+            if len(complement_combination) > 1:
+                self.board.emit(
+                    "naked_tuple",
+                    constraint=self,
+                    cells=combination,
+                    digits=MASK_DIGITS[combination_mask],
+                    tuple_name=tuple_name,
+                )
+            else:
+                possibles_mask = (
+                    complement_combination[0].possibles_mask & ~combination_mask
+                )
+                self.board.emit(
+                    "last_place",
+                    constraint=self,
+                    cells=complement_combination,
+                    digits=MASK_DIGITS[possibles_mask][:1],
+                )
+        self.note_tuple(combination)
+        self.note_tuple(complement_combination)
 
     def note_tuple(self, to_note):
         to_note = tuple(sorted(to_note))
-        self.tuples_noted.add(to_note)
+        if to_note not in self.tuples_noted:
+            self.tuples_noted.add(to_note)
+            self.board.record_undo(self.tuples_noted.discard, to_note)
         if len(to_note) == 2:
-            self.board.known_pairs.add(to_note)
+            self.board.note_known_pair(to_note)
 
     def _initialise_corner_marks(self):
         if len(self.cells) < 9:
@@ -677,22 +2015,20 @@ class NoRepeatsConstraint(Constraint):
 
     def update_possibles(self):
         super().update_possibles()
-        all_possible_assignments = (
-            self.get_all_possible_assignments()
-        )  # TODO caching on this
-        if all_possible_assignments is None:
+        if self.candidate_product > ALL_POSSIBLE_ASSIGNMENTS_LIMIT:
+            # Too many to enumerate, as Constraint.update_possibles has found
             return
-        digit_counts = defaultdict(int)
-        for assignment in all_possible_assignments:
-            for digit in set(assignment.values()):
-                digit_counts[digit] += 1
-
-        for digit, count in digit_counts.items():
-            if count == len(all_possible_assignments):
-                if digit not in self.corner_marks:
-                    self.add_corner_mark(
-                        digit, [cell for cell in self.cells if digit in cell.possibles]
-                    )
+        assignment_matrix = self.get_assignment_matrix()
+        if assignment_matrix is None:
+            return
+        row_masks = np.bitwise_or.reduce(DIGIT_BITS[assignment_matrix], axis=1)
+        always_present = int(np.bitwise_and.reduce(row_masks))
+
+        for digit in MASK_DIGITS[always_present]:
+            if digit not in self.corner_marks:
+                self.add_corner_mark(
+                    digit, [cell for cell in self.cells if digit in cell.possibles]
+                )
 
 
 class Row(NoRepeatsConstraint):
@@ -749,8 +2085,11 @@ class Cell:
         self.box = get_box(row, column)
         self.finalised = False
 
-        self._possibles = set(range(1, 10))
+        # Fixed identity (0-80) used for hashing, ordering and indexing board arrays
+        self.index = len(board.cells)
+        self.board.masks.append(ALL_DIGITS_MASK)
         self.constraints = []
+        self.constraint_bits = 0
         self.board.cells.append(self)
         self.finalise_constraint = FinaliseConstraint(board, self)
 
@@ -758,68 +2097,102 @@ class Cell:
         return "R{}C{}".format(self.row, self.column)
 
     def __hash__(self):
-        if not hasattr(self, "id"):
-            self.id = uuid.uuid4()
-        return hash(self.id)
+        return self.index
+
+    def __reduce__(self):
+        return _unpickle_hashable, (Cell, {"index": self.index}), self.__dict__
 
     def __lt__(self, other):
-        return hash(self) < hash(other)
+        return self.index < other.index
 
     def finalise(self):
         if self.finalised:
             return
+        mask = self.board.masks[self.index]
         assert (
-            len(self._possibles) == 1
+            POPCOUNT[mask] == 1
         ), "Error: attempting to finalise a cell that can still take two values!"
 
-        self.value = min(self._possibles)
-        if not any([type(constraint) is GivenDigit for constraint in self.constraints]):
-            print_msg("Finalising {} as {}".format(self, self.value))
+        self.value = MASK_DIGITS[mask][0]
+        if self.board.events and not any(
+            [type(constraint) is GivenDigit for constraint in self.constraints]
+        ):
+            self.board.emit("finalise", cells=[self], digits=[self.value])
         self.finalised = True
+        self.board.unfinalised_cells.remove(self)
+        self.board.record_undo(self._unfinalise)
 
         for constraint in self.constraints:
             if hasattr(constraint, "remove_finalised"):
                 constraint.remove_finalised()
 
-        self.board.unfinalised_cells.remove(self)
-        nodes_to_remove = [v for v in self.board.forcing_values if v[0] == self]
-        self.board.forcing_values.remove_nodes_from(nodes_to_remove)
+        self.board.remove_forcing_nodes([(self, value) for value in range(1, 10)])
+
+    def _unfinalise(self):
+        self.finalised = False
+        del self.value
+        self.board.unfinalised_cells.add(self)
 
     def remove_possible(self, value):
-        if value not in self._possibles:
+        if not self.board.masks[self.index] & DIGIT_MASKS.get(value, 0):
             return
         self.remove_possibles([value])
 
     def remove_possibles(self, values):
+        self.remove_mask(digits_to_mask(values))
+
+    def set_mask(self, mask):
+        """
+        Sets the cell's candidates, updating its constraints' candidate_product.
+        Doesn't record an undo or queue any constraints.
+        """
+        masks = self.board.masks
+        old_factor = CANDIDATE_FACTORS[masks[self.index]]
+        new_factor = CANDIDATE_FACTORS[mask]
+        masks[self.index] = mask
+        for constraint in self.constraints:
+            constraint.candidate_product = (
+                constraint.candidate_product // old_factor * new_factor
+            )
+
+    def remove_mask(self, mask):
         if self.finalised:
             return
 
-        to_remove = {value for value in values if value in self._possibles}
-
-        for value in to_remove:
-            self._possibles.remove(value)
+        old_mask = self.board.masks[self.index]
+        to_remove = old_mask & mask
+        if not to_remove:
+            return
 
-            if (self, value) in self.board.forcing_values:
-                self.board.forcing_values.remove_node((self, value))
+        new_mask = old_mask & ~to_remove
+        self.board.record_undo(self.set_mask, old_mask)
+        self.set_mask(new_mask)
+        self.board.modification_count += POPCOUNT[to_remove]
+        self.board.eliminations.extend(
+            [(self, value) for value in MASK_DIGITS[to_remove]]
+        )
 
-            if len(self._possibles) == 0:
-                raise SudokuContradiction("No values left in {}".format(self))
-            if len(self._possibles) == 1:
-                self.board.constraints_to_check.appendleft(self.finalise_constraint)
+        self.board.remove_forcing_nodes(
+            [(self, value) for value in MASK_DIGITS[to_remove]]
+        )
 
-        if to_remove:
-            for constraint in self.constraints:
-                if constraint not in self.board.constraints_to_check:
-                    self.board.constraints_to_check.append(constraint)
+        if not new_mask:
+            raise SudokuContradiction("No values left in {}".format(self))
+        if not new_mask & (new_mask - 1):
+            self.board.constraints_to_check.appendleft(self.finalise_constraint)
 
-                constraint.update_all_corner_marks(self)
+        for constraint in self.constraints:
+            self.board.constraints_to_check.append(constraint)
 
-    def snapshot_possibles(self):
-        return tuple(sorted({i for i in self._possibles}))
+            constraint.update_all_corner_marks(self)
 
     @property
     def possibles(self):
-        return self._possibles
+        return MASK_DIGIT_SETS[self.board.masks[self.index]]
+
+    @property
+    def possibles_mask(self):
+        return self.board.masks[self.index]
 
     @property
     def coordinates(self):
@@ -837,23 +2210,23 @@ class Cell:
 
     @property
     def bifurcation_score(self):
-        cells_sharing_constraint = {
-            cell
-            for constraint in self.constraints
-            for cell in constraint.cells
-            if issubclass(type(constraint), NoRepeatsConstraint)
-            and not cell.finalised
-            and cell.possibles.intersection(self._possibles)
-        }
-        return sum([1 / len(cell.possibles) ** 3 for cell in cells_sharing_constraint])
+        masks = self.board.masks
+        mask = masks[self.index]
+        return sum(
+            [
+                1 / POPCOUNT[masks[index]] ** 3
+                for index in iter_bits(
+                    self.board.peer_index.peers[self.index] | 1 << self.index
+                )
+                if not self.board.cells[index].finalised and masks[index] & mask
+            ]
+        )
 
     def intersect_possibles(self, others):
-        to_remove = set()
-        for possible in self._possibles:
-            if possible not in others:
-                to_remove.add(possible)
-        if to_remove:
-            self.remove_possibles(to_remove)
+        self.intersect_mask(digits_to_mask(others))
+
+    def intersect_mask(self, mask):
+        self.remove_mask(ALL_DIGITS_MASK & ~mask)
 
     def manhattan_distance(self, other_cell):
         return abs(self.coordinates[0] - other_cell.coordinates[0]) + abs(
@@ -10,6 +10,7 @@ from tqdm import tqdm as tq
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from sudoku import Board, MultipleSolutionsFound, NoSolutionFound, SudokuContradiction
+from events import HumanLog
 from constraints import (
     InternalConsecutiveConstraint,
     InternalAverageSandwichConstraint,
@@ -161,6 +162,7 @@ def iter_boards():
             cell_flags = [i in true_cells for i in range(16)]
 
             board = Board()
+            board.events.subscribe(HumanLog())
 
             # Left branch
             for col in range(1, 5):
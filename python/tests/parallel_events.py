@@ -0,0 +1,35 @@
+# Solves silent_night with and without a bifurcation pool, checking that both
+# publish the same hypotheses and solutions
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from events import EventCounter
+from tests.silent_night import build_board
+
+# Propagation events inside a hypothesis depend on the state of the board it is
+# tested on, which differs in pool workers, so only these kinds are compared
+COMPARED_KINDS = [
+    "bifurcation",
+    "bifurcation_result",
+    "implication_contradiction",
+    "solution",
+]
+
+
+def count_events(parallel_bifurcations):
+    board = build_board()
+    board.parallel_bifurcations = parallel_bifurcations
+    counter = board.events.subscribe(EventCounter())
+    board.solve()
+    return {kind: counter.counts[kind] for kind in COMPARED_KINDS}
+
+
+if __name__ == "__main__":
+    sequential = count_events(0)
+    parallel = count_events(2)
+    print("Sequential", sequential)
+    print("Parallel  ", parallel)
+    assert sequential == parallel, "Parallel solve published different events"
+    assert sequential["solution"] == 1
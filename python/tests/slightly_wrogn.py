@@ -11,6 +11,7 @@ from sudoku import (
     SudokuContradiction,
     MultipleSolutionsFound,
 )
+from events import HumanLog
 from constraints import Arrow, KillerCage, Skyscraper, BlackKropki, Palindrome
 from itertools import combinations, product
 from tqdm import tqdm as tq
@@ -107,6 +108,7 @@ for i, invalid_builders in enumerate(
     ]
 
     board = Board()
+    board.events.subscribe(HumanLog())
     for builder in valid_builders:
         builder(board)
 
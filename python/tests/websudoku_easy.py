@@ -6,28 +6,36 @@ import traceback
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from sudoku import Board, GivenDigit
+from events import HumanLog
 
-board = Board()
-givens = [
-    [0, 2, 0, 0, 0, 6, 0, 8, 0],
-    [0, 9, 6, 0, 1, 5, 0, 0, 2],
-    [5, 0, 7, 0, 3, 0, 4, 0, 0],
-    [0, 3, 0, 5, 0, 0, 0, 0, 4],
-    [2, 0, 1, 4, 0, 8, 9, 0, 3],
-    [8, 0, 0, 0, 0, 9, 0, 1, 0],
-    [0, 0, 5, 0, 9, 0, 2, 0, 8],
-    [9, 0, 0, 1, 8, 0, 3, 5, 0],
-    [0, 6, 0, 2, 0, 0, 0, 9, 0],
-]
 
-for i, digits in enumerate(givens):
-    for j, digit in enumerate(digits):
-        if digit != 0:
-            row = i + 1
-            column = j + 1
-            GivenDigit(board, row, column, digit)
+def build_board():
+    board = Board()
+    givens = [
+        [0, 2, 0, 0, 0, 6, 0, 8, 0],
+        [0, 9, 6, 0, 1, 5, 0, 0, 2],
+        [5, 0, 7, 0, 3, 0, 4, 0, 0],
+        [0, 3, 0, 5, 0, 0, 0, 0, 4],
+        [2, 0, 1, 4, 0, 8, 9, 0, 3],
+        [8, 0, 0, 0, 0, 9, 0, 1, 0],
+        [0, 0, 5, 0, 9, 0, 2, 0, 8],
+        [9, 0, 0, 1, 8, 0, 3, 5, 0],
+        [0, 6, 0, 2, 0, 0, 0, 9, 0],
+    ]
 
-try:
-    board.solve()
-finally:
-    print(board)
\ No newline at end of file
+    for i, digits in enumerate(givens):
+        for j, digit in enumerate(digits):
+            if digit != 0:
+                row = i + 1
+                column = j + 1
+                GivenDigit(board, row, column, digit)
+    return board
+
+
+if __name__ == "__main__":
+    board = build_board()
+    board.events.subscribe(HumanLog())
+    try:
+        board.solve()
+    finally:
+        print(board)